@@ -1,3 +1,6 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np 
 import pandas as pd
 
@@ -26,86 +29,107 @@ def generate_data(seed, obs, std_dev, eligibility_threshold, treatment_effect,
     """
 
 
-    # initialize random state, generate data
-    random_state = np.random.default_rng(seed) 
-    running_variable = random_state.normal(loc = eligibility_threshold, size=obs) 
-
-    #There are four cases:
-
-    #Case 1: Positive Slope, Treatment Above the Cutoff 
-
-    if (positive_slope == True) & (after_cutoff == True):
-        # Apply Treatment above Cutoff
-        treat = np.where(running_variable > eligibility_threshold, True, False)
-        
-        # Treatment Effect Discontinuity
-        value_error = random_state.normal(0, std_dev, obs) + (treatment_effect * treat)
-        y = running_variable + value_error
-
-        # RETURN Pandas DF
-        spoofed_data = pd.DataFrame(
-            {
-                "X": running_variable,
-                "treatment": treat,
-                "Y":y,
-            }
-        )
-        return spoofed_data
-    
-    # Case 2: Positive Slope, Treatment Below Cutoff 
-
-    elif (positive_slope == True) & (after_cutoff == False):
-        # Apply Treatment above Cutoff
-        treat = np.where(running_variable < eligibility_threshold, True, False)
-        
-        # Treatment Effect Discontinuity
-        value_error = random_state.normal(0, std_dev, obs) + (treatment_effect * treat)
-        y = running_variable + value_error
-
-        # RETURN Pandas DF
-        spoofed_data = pd.DataFrame(
-            {
-                "X": running_variable,
-                "treatment": treat,
-                "Y":y,
-            }
-        )
-        return spoofed_data
-
-    # Case 3: Negatove Slope, Treatment Above Cutoff    
-
-    elif (positive_slope == False) & (after_cutoff == True):
-        # Apply Treatment above Cutoff
-        treat = np.where(running_variable > eligibility_threshold, True, False)
-        
-        # Treatment Effect Discontinuity
-        value_error = random_state.normal(0, std_dev, obs) + (treatment_effect * treat)
-        y = - running_variable + value_error
-
-        # RETURN Pandas DF
-        spoofed_data = pd.DataFrame(
-            {
-                "X": running_variable,
-                "treatment": treat,
-                "Y":y,
-            }
-        )
-        return spoofed_data
-
-    elif (positive_slope == False) & (after_cutoff == False):
-        # Apply Treatment above Cutoff
-        treat = np.where(running_variable < eligibility_threshold, True, False)
-        
-        # Treatment Effect Discontinuity
-        value_error = random_state.normal(0, std_dev, obs) + (treatment_effect * treat)
-        y = - running_variable + value_error
-
-        # RETURN Pandas DF
-        spoofed_data = pd.DataFrame(
-            {
-                "X": running_variable,
-                "treatment": treat,
-                "Y":y,
-            }
-        )
-        return spoofed_data
\ No newline at end of file
+    # generate a single replicate and convert it to a data frame
+    running_variable, treat, y = generate_replicates(
+        seed, obs, std_dev, eligibility_threshold, treatment_effect,
+        replicates=1, positive_slope=positive_slope, after_cutoff=after_cutoff)
+
+    # RETURN Pandas DF
+    spoofed_data = pd.DataFrame(
+        {
+            "X": running_variable[0],
+            "treatment": treat[0],
+            "Y": y[0],
+        }
+    )
+    return spoofed_data
+
+
+def generate_replicates(seed, obs, std_dev, eligibility_threshold, treatment_effect,
+                        replicates, positive_slope = True, after_cutoff = True,
+                        dtype = np.float64, out = None):
+
+    """
+    Generate several replicates of the data at once, each row in the returned arrays
+    is one replicate. All computations are done in place on preallocated buffers.
+    With replicates=1 and dtype=np.float64, the values are the same as generate_data.
+
+    INPUTS
+    ------
+    - seed: random state value (or numpy.random.SeedSequence) included for reproducability
+    - obs: integer representing number of observations
+    - std_dev: constant that represents change between pre/post test values
+    - treatment_effect: constant representing the base level of change
+    - replicates: number of replicates
+    - dtype: np.float64 or np.float32
+    - out: optional tuple of (X, treatment, Y) arrays with shape (replicates, obs) to
+    store the results, they are allocated if not passed
+
+    OUTPUT
+    ------
+    (X, treatment, Y): 2-D arrays with shape (replicates, obs)
+    """
+    if out is None:
+        out = (np.empty((replicates, obs), dtype=dtype),
+               np.empty((replicates, obs), dtype=bool),
+               np.empty((replicates, obs), dtype=dtype))
+
+    running_variable, treat, y = out
+    random_state = np.random.default_rng(seed)
+
+    for r in range(replicates):
+        # same as random_state.normal(loc=eligibility_threshold, size=obs), and
+        # random_state.normal(0, std_dev, obs), but without temporary arrays
+        random_state.standard_normal(dtype=dtype, out=running_variable[r])
+        running_variable[r] += eligibility_threshold
+        random_state.standard_normal(dtype=dtype, out=y[r])
+        y[r] *= std_dev
+
+    # Apply Treatment above (or below) Cutoff
+    if after_cutoff:
+        np.greater(running_variable, eligibility_threshold, out=treat)
+    else:
+        np.less(running_variable, eligibility_threshold, out=treat)
+
+    # Treatment Effect Discontinuity
+    np.add(y, treatment_effect, out=y, where=treat)
+
+    # the slope is 1 or -1
+    if positive_slope:
+        y += running_variable
+    else:
+        y -= running_variable
+
+    return running_variable, treat, y
+
+
+def iter_replicates(seed, obs, std_dev, eligibility_threshold, treatment_effect,
+                    replicates, batch_size, positive_slope = True, after_cutoff = True,
+                    dtype = np.float64, n_jobs = 1):
+
+    """
+    Yield batches of replicates (see generate_replicates), each batch uses an independent
+    random stream spawned from seed, so the results do not depend on n_jobs. Batches are
+    generated in a process pool if n_jobs > 1 and yielded in order.
+
+    OUTPUT
+    ------
+    Generator of (X, treatment, Y) tuples, arrays have shape (batch_size, obs), except
+    for the last one, which can be smaller
+    """
+    sizes = [min(batch_size, replicates - start) for start in range(0, replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    generate = partial(_generate_batch, obs=obs, std_dev=std_dev,
+                       eligibility_threshold=eligibility_threshold,
+                       treatment_effect=treatment_effect, positive_slope=positive_slope,
+                       after_cutoff=after_cutoff, dtype=dtype)
+
+    if n_jobs == 1:
+        yield from map(generate, seeds, sizes)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            yield from executor.map(generate, seeds, sizes)
+
+
+def _generate_batch(seed, size, **kwargs):
+    return generate_replicates(seed, replicates=size, **kwargs)
@@ -1,6 +1,14 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import arviz as az
+import numpy as np
+import pandas as pd
 import pymc as pm
+import xarray as xr
 
-def train_model(data, eligibility_threshold, random_seed, positive_slope = True):
+def train_model(data, eligibility_threshold, random_seed, positive_slope = True,
+                backend = "full"):
 
     """ 
     Train the Bayesian regression discontinuity model. 
@@ -13,6 +21,10 @@ def train_model(data, eligibility_threshold, random_seed, positive_slope = True)
     - random_seed: random seed specified for reproducability purposes
     - positive_slope: binary parameter based on previously generated data, model trains depending
     on the data's overall distribution 
+    - backend: "full" evaluates the likelihood of every observation, "sufficient" reduces
+    the data to sufficient statistics first (see sufficient_statistics) so the cost of
+    sampling does not depend on the number of observations. With "sufficient", data can
+    also be an iterable of dataframes, and the model has no mu or y variables
 
     Outputs
     -------
@@ -20,25 +32,267 @@ def train_model(data, eligibility_threshold, random_seed, positive_slope = True)
     - trained_mod: Bayesian regression discontinuity model object 
     - inf_data: inference data we can sample to estimate the posterior distribution 
     """
-    with pm.Model() as trained_mod:
+    if backend == "sufficient":
+        trained_mod = build_sufficient_model(
+            sufficient_statistics(data, positive_slope), eligibility_threshold)
+    elif backend == "full":
+        trained_mod = build_model(data, eligibility_threshold, positive_slope)
+    else:
+        raise ValueError(f'backend must be "full" or "sufficient", got {backend!r}')
+
+    # get inference data
+    with trained_mod:
+        inf_data = pm.sample(cores=1, random_seed=random_seed)
+
+    return trained_mod, inf_data
+
+
+def build_model(data, eligibility_threshold, positive_slope = True):
+
+    """
+    Build the Bayesian regression discontinuity model. Everything that changes from one
+    scenario to another (observations, eligibility threshold and the sign of the slope) is
+    stored in MutableData containers, so the same model can be reused with set_scenario.
+    Compiled functions read the containers when called, so a step method created once
+    (e.g., pm.NUTS(model=model)) can be passed to pm.sample for every scenario without
+    recompiling the log-probability and its gradient (see sample_scenarios).
+
+    Inputs
+    ------
+
+    - data: dataframe consiting of X-values, treatment status, and Y values
+    - eligibility_threshold: predefined eligibility
+    - positive_slope: binary parameter based on previously generated data
+
+    Outputs
+    -------
+
+    - model: Bayesian regression discontinuity model object (not trained)
+    """
+    with pm.Model() as model:
 
         # pass in observations
         treated_obs = pm.MutableData("treated_obs", data.treatment, dims="obs_id")
         x_vals = pm.MutableData("x_vals", data.X, dims="obs_id")
+        y_obs = pm.MutableData("y_obs", data.Y, dims="obs_id")
+
+        # scenario parameters (floats, so they can be swapped with any value)
+        threshold = pm.MutableData("eligibility_threshold", float(eligibility_threshold))
+        slope = pm.MutableData("slope", 1.0 if positive_slope else -1.0)
+
+        # model parameters
+        effect_size = pm.Cauchy("effect", alpha=threshold, beta=1)
+        s = pm.HalfNormal("sigma", 1)
+
+        u = pm.Deterministic("mu", slope * x_vals + (effect_size * treated_obs), dims="obs_id")
+
+        obs = pm.Normal("y", mu=u, sigma=s, observed=y_obs, dims="obs_id")
+
+    return model
+
+
+def sufficient_statistics(data, positive_slope = True, chunksize = 10**6):
+
+    """
+    Reduce the data to the statistics the likelihood depends on. The slope is known, so the
+    residuals y - (+/-) x are normally distributed with mean 0 (untreated) or effect (treated)
+    and standard deviation sigma: the count, mean and sum of squared deviations from the mean
+    of the residuals in each treatment group are enough to evaluate the likelihood.
+
+    The data is processed in a single vectorized pass over chunks, which are merged with
+    Chan et al.'s formulas, so memory usage depends on the chunk size and not on the number
+    of observations.
+
+    Inputs
+    ------
+
+    - data: dataframe consiting of X-values, treatment status, and Y values (processed in
+    chunks of chunksize rows), or an iterable of such dataframes
+    - positive_slope: binary parameter based on previously generated data
+    - chunksize: number of rows per chunk when data is a dataframe
+
+    Outputs
+    -------
+
+    - stats: dictionary with n, mean and m2 arrays, the first element corresponds to the
+    untreated group and the second one to the treated group
+    """
+    if isinstance(data, pd.DataFrame):
+        chunks = (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+    else:
+        chunks = data
+
+    sign = 1.0 if positive_slope else -1.0
+    n, mean, m2 = np.zeros(2), np.zeros(2), np.zeros(2)
+
+    for chunk in chunks:
+        treated = np.asarray(chunk.treatment, dtype=np.intp)
+        resid = np.asarray(chunk.Y, dtype=np.float64) - sign * np.asarray(chunk.X, dtype=np.float64)
+
+        n_chunk = np.bincount(treated, minlength=2).astype(np.float64)
+        sum_chunk = np.bincount(treated, weights=resid, minlength=2)
+        mean_chunk = np.divide(sum_chunk, n_chunk, out=np.zeros(2), where=n_chunk > 0)
+        m2_chunk = np.bincount(treated, weights=(resid - mean_chunk[treated])**2, minlength=2)
+
+        # merge with the statistics of the previous chunks
+        total = n + n_chunk
+        weight = np.divide(n_chunk, total, out=np.zeros(2), where=total > 0)
+        delta = mean_chunk - mean
+        mean = mean + delta * weight
+        m2 = m2 + m2_chunk + delta**2 * n * weight
+        n = total
+
+    return dict(n=n, mean=mean, m2=m2)
+
+
+def build_sufficient_model(stats, eligibility_threshold):
+
+    """
+    Build the Bayesian regression discontinuity model from the output of
+    sufficient_statistics. It has the same priors as build_model and its likelihood
+    (a pm.Potential) is the same up to a constant, but it is evaluated in constant time.
+
+    Inputs
+    ------
+
+    - stats: dictionary returned by sufficient_statistics
+    - eligibility_threshold: predefined eligibility
+
+    Outputs
+    -------
+
+    - model: Bayesian regression discontinuity model object (not trained)
+    """
+    coords = {"group": ["untreated", "treated"]}
+
+    with pm.Model(coords=coords) as model:
+
+        # pass in the statistics
+        n = pm.ConstantData("n", stats["n"], dims="group")
+        mean = pm.ConstantData("mean", stats["mean"], dims="group")
+        m2 = pm.ConstantData("m2", stats["m2"], dims="group")
 
         # model parameters
         effect_size = pm.Cauchy("effect", alpha=eligibility_threshold, beta=1)
         s = pm.HalfNormal("sigma", 1)
 
-        if positive_slope == True: 
-            u = pm.Deterministic("mu", x_vals + (effect_size * treated_obs), dims="obs_id")
-        else: 
-            u = pm.Deterministic("mu", - x_vals + (effect_size * treated_obs), dims="obs_id")
-            
-        obs = pm.Normal("y", mu=u, sigma=s, observed=data.Y, dims="obs_id")
+        # sum of squared deviations from the means implied by the model (0 for the
+        # untreated group, effect for the treated group)
+        squares = m2.sum() + n[0] * mean[0]**2 + n[1] * (mean[1] - effect_size)**2
 
-    # get inference data
-    with trained_mod:
-        inf_data = pm.sample(cores=1, random_seed=random_seed)
+        pm.Potential("likelihood", -n.sum() * pm.math.log(s) - squares / (2 * s**2))
 
-    return trained_mod, inf_data
+    return model
+
+
+def set_scenario(model, data, eligibility_threshold, positive_slope = True):
+
+    """
+    Swap the data and scenario parameters of a model created with build_model
+    """
+    pm.set_data(
+        {
+            "treated_obs": data.treatment,
+            "x_vals": data.X,
+            "y_obs": data.Y,
+            "eligibility_threshold": float(eligibility_threshold),
+            "slope": 1.0 if positive_slope else -1.0,
+        },
+        model=model,
+    )
+
+
+def sample_scenarios(scenarios, random_seed, chains = 4, cores = None, draws = 1000,
+                     tune = 1000):
+
+    """
+    Train the model on several scenarios (e.g., the four slope/cutoff combinations or
+    a sweep over eligibility thresholds). Each (scenario, chain) pair is sampled as a
+    separate task in a pool of processes; every process builds the model and its NUTS step
+    once and swaps the data with set_scenario for each task it receives.
+
+    Inputs
+    ------
+
+    - scenarios: dictionary mapping a scenario name to a dictionary with the data,
+    eligibility_threshold and (optionally) positive_slope arguments
+    - random_seed: random seed specified for reproducability purposes, each chain gets its
+    own seed derived from it
+    - chains: number of chains per scenario
+    - cores: total number of processes to use (defaults to the number of CPUs), with
+    cores=1, everything runs in the current process
+    - draws, tune: passed to pm.sample
+
+    Outputs
+    -------
+
+    - inf_data: inference data with a "scenario" dimension in every group. If scenarios
+    have different numbers of observations, the per-observation variables of the smaller
+    ones are padded with NaNs
+    """
+    names = list(scenarios)
+    tasks = [scenarios[name] for name in names for _ in range(chains)]
+
+    seeds = [int(seq.generate_state(1)[0])
+             for seq in np.random.SeedSequence(random_seed).spawn(len(tasks))]
+
+    cores = cores or os.cpu_count()
+    workers = max(1, min(cores, len(tasks)))
+    template = tasks[0]
+    sample_kwargs = dict(draws=draws, tune=tune)
+
+    if workers == 1:
+        _init_worker(template)
+        results = [_sample_chain(task, seed, sample_kwargs)
+                   for task, seed in zip(tasks, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(template, )) as executor:
+            results = list(executor.map(_sample_chain, tasks, seeds,
+                                        [sample_kwargs] * len(tasks)))
+
+    by_scenario = [_concat(results[i * chains:(i + 1) * chains], "chain", np.arange(chains))
+                   for i in range(len(names))]
+
+    return _concat(by_scenario, "scenario", pd.Index(names, name="scenario"))
+
+
+# the model and step built by each process (see _init_worker)
+_MODEL = None
+_STEP = None
+
+
+def _init_worker(template):
+    global _MODEL, _STEP
+    _MODEL = build_model(**template)
+
+    # creating the step compiles the log-probability and its gradient, pm.sample
+    # resets its tuning (step size and mass matrix) on every call
+    _STEP = pm.NUTS(model=_MODEL)
+
+
+def _sample_chain(scenario, random_seed, sample_kwargs):
+    set_scenario(_MODEL, **scenario)
+
+    with _MODEL:
+        return pm.sample(step=_STEP, chains=1, cores=1, random_seed=random_seed,
+                         progressbar=False, compute_convergence_checks=False,
+                         **sample_kwargs)
+
+
+def _concat(inf_datas, dim, index):
+    # concatenate inference data objects along dim, groups that do not have the dim
+    # (e.g., observed_data when concatenating chains) are taken from the first one
+    groups = {}
+
+    for group in inf_datas[0].groups():
+        datasets = [inf_data[group] for inf_data in inf_datas]
+
+        if dim == "chain" and dim not in datasets[0].dims:
+            groups[group] = datasets[0]
+        elif dim == "chain":
+            groups[group] = xr.concat(datasets, dim=dim).assign_coords(chain=index)
+        else:
+            groups[group] = xr.concat(datasets, dim=index)
+
+    return az.InferenceData(**groups)
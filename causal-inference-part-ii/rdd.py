@@ -1,11 +1,20 @@
 # %%
+import time
+
 import numpy as np
 import pandas as pd
+import pymc as pm
 
 
-from visuals import data_scatterplot, diagnostic_plots, regression_discontinuity_plot
+from visuals import (
+    data_scatterplot,
+    diagnostic_plots,
+    regression_discontinuity_plot,
+    mu_hdi_bands,
+    mu_hdi_bands_sampled,
+)
 from dataset import generate_data
-from model import train_model
+from model import train_model, sample_scenarios
 
 ## DECLARE PARAMETERS
 
@@ -37,10 +46,64 @@ data_scatterplot(df, ELIGIBILITY_THRESHOLD)
 mod, inference_data = train_model(df, ELIGIBILITY_THRESHOLD, SEED, positive_slope=True)
 
 
+# %%
+# sweep the four slope/cutoff scenarios, the model is built once per process and
+# chains and scenarios are sampled in parallel
+scenarios = {
+    f"slope={slope}, after_cutoff={after}": dict(
+        data=generate_data(
+            SEED, N, STD, ELIGIBILITY_THRESHOLD, TE, positive_slope=slope, after_cutoff=after
+        ),
+        eligibility_threshold=ELIGIBILITY_THRESHOLD,
+        positive_slope=slope,
+    )
+    for slope in (True, False)
+    for after in (True, False)
+}
+
+scenarios_data = sample_scenarios(scenarios, SEED, chains=4, cores=8)
+scenarios_data.posterior["effect"].mean(dim=("chain", "draw")).to_series()
+
+
 # %%
 # build out diagnostics of mode
 diagnostic_plots(inference_data, TE, STD)
 
+# %%
+# train from sufficient statistics (per treatment group counts, means and sum of
+# squares), sampling no longer depends on the number of observations
+start = time.perf_counter()
+mod_sufficient, inference_data_sufficient = train_model(
+    df, ELIGIBILITY_THRESHOLD, SEED, positive_slope=True, backend="sufficient"
+)
+print(f"Sufficient statistics backend: {time.perf_counter() - start:.3f} s")
+
+diagnostic_plots(inference_data_sufficient, TE, STD)
+
 # %%
 # visualize regression discontinuity
-regression_discontinuity_plot(df, ELIGIBILITY_THRESHOLD, mod, inference_data)
+regression_discontinuity_plot(
+    df, ELIGIBILITY_THRESHOLD, mod, inference_data, positive_slope=True
+)
+
+# %%
+# compare computing the regression lines' intervals from the posterior samples
+# with sampling them (4,000 draws, 10^4 points). train_model samples 2 chains
+# of 1,000 draws, so we sample 4 chains here
+with mod:
+    inference_data_4000 = pm.sample(chains=4, cores=1, random_seed=SEED)
+
+n_draws = inference_data_4000.posterior.sizes["chain"] * inference_data_4000.posterior.sizes["draw"]
+print(f"Draws: {n_draws:,}")
+
+grid = np.linspace(df.X.min(), df.X.max(), 10**4)
+
+start = time.perf_counter()
+mu_hdi_bands(inference_data_4000, grid, positive_slope=True)
+fast = time.perf_counter() - start
+
+start = time.perf_counter()
+mu_hdi_bands_sampled(mod, inference_data_4000, grid)
+sampled = time.perf_counter() - start
+
+print(f"From posterior: {fast:.3f} s, sampled: {sampled:.3f} s")
@@ -1,19 +1,27 @@
 import arviz as az
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgb
 import numpy as np
 import pymc as pm
 import seaborn as sns
 
 
-def data_scatterplot(data, eligibility_threshold):
+def data_scatterplot(data, eligibility_threshold, density=None, max_points=10**5,
+                     bins=(800, 450)):
 
     """
     Take spoofed scatterplot data (features: X, treatment indicator, Y) and then plot
     utilizing matplotlib.
 
+    With many observations, drawing every point is slow and the figure becomes huge, so
+    the points are binned into a 2-D histogram per group instead (see density_plot).
+
     INPUTS
     ------
     - df: pandas dataframe
+    - density: True to plot the binned density, False to plot every point, by default,
+    it is True when there are more than max_points observations
+    - bins: number of bins (x, y) when plotting the density
 
     OUTPUTS
     -------
@@ -24,6 +32,29 @@ def data_scatterplot(data, eligibility_threshold):
     sns.set_style("darkgrid")
     fig, ax = plt.subplots(figsize=(16, 9))
 
+    if density is None:
+        density = len(data) > max_points
+
+    if density:
+        density_plot(ax, data, bins)
+    else:
+        _scatter(ax, data)
+
+    # plot vertical line denoting cutoff
+    plt.axvline(
+        x=eligibility_threshold, ls="-", color="black", label="Eligibility Threshold"
+    )
+
+    # labels and legends
+    ax.set_xlabel("X Values - Pre/Post Program")
+    ax.set_ylabel("Y Values - Post Program")
+    ax.set_title("General Sharp RDD Setup")
+    ax.legend()
+
+    return ax
+
+
+def _scatter(ax, data):
     # plot treated values as scatter
     ax.scatter(
         data.X[data.treatment],
@@ -42,18 +73,75 @@ def data_scatterplot(data, eligibility_threshold):
         label="Untreated Group",
     )
 
-    # plot vertical line denoting cutoff
-    plt.axvline(
-        x=eligibility_threshold, ls="-", color="black", label="Eligibility Threshold"
-    )
 
-    # labels and legends
-    ax.set_xlabel("X Values - Pre/Post Program")
-    ax.set_ylabel("Y Values - Post Program")
-    ax.set_title("General Sharp RDD Setup")
-    ax.legend()
+def density_plot(ax, data, bins=(800, 450)):
 
-    return ax
+    """
+    Plot the treated and untreated groups as 2-D histograms, each one as an image
+    in the group's color whose opacity increases with the (log) number of points in
+    each bin. Points are binned in a single vectorized pass, and a fixed-size image is
+    drawn per group, so the time to render does not depend on the number of observations.
+
+    INPUTS
+    ------
+    - ax: matplotlib axes
+    - data: pandas dataframe
+    - bins: number of bins (x, y)
+
+    OUTPUTS
+    -------
+    - counts: array with shape (2, bins[1], bins[0]) with the number of untreated
+    and treated points in each bin
+    """
+    counts, extent = bin_groups(data, bins)
+
+    # match the colors the scatter plot uses
+    groups = [(1, "C0", "Treated Group"), (0, "C1", "Untreated Group")]
+
+    for group, color, label in groups:
+        image = np.zeros(counts.shape[1:] + (4, ))
+        image[..., :3] = to_rgb(color)
+        image[..., 3] = np.log1p(counts[group]) / max(np.log1p(counts[group].max()), 1)
+
+        ax.imshow(image, extent=extent, origin="lower", aspect="auto",
+                  interpolation="nearest")
+
+        # images do not show up in the legend, add an empty scatter instead
+        ax.scatter([], [], color=color, alpha=0.4, s=5, label=label)
+
+    return counts
+
+
+def bin_groups(data, bins=(800, 450)):
+
+    """
+    Count the untreated and treated points in each bin of a (bins[0], bins[1]) grid
+    spanning the range of X and Y, computing the bin of each point once
+
+    OUTPUTS
+    -------
+    - counts: array with shape (2, bins[1], bins[0]), counts[1] are the treated points,
+    rows correspond to y values
+    - extent: (x_min, x_max, y_min, y_max)
+    """
+    x = data.X.to_numpy()
+    y = data.Y.to_numpy()
+    treated = data.treatment.to_numpy(dtype=np.intp)
+
+    x_bins, y_bins = bins
+    x_min, x_max = x.min(), x.max()
+    y_min, y_max = y.min(), y.max()
+
+    # the maximum value goes in the last bin
+    x_idx = ((x - x_min) * (x_bins / ((x_max - x_min) or 1))).astype(np.intp)
+    y_idx = ((y - y_min) * (y_bins / ((y_max - y_min) or 1))).astype(np.intp)
+    np.minimum(x_idx, x_bins - 1, out=x_idx)
+    np.minimum(y_idx, y_bins - 1, out=y_idx)
+
+    flat = (treated * y_bins + y_idx) * x_bins + x_idx
+    counts = np.bincount(flat, minlength=2 * y_bins * x_bins).reshape(2, y_bins, x_bins)
+
+    return counts, (x_min, x_max, y_min, y_max)
 
 
 def diagnostic_plots(inf_data, treatment_effect, std):
@@ -86,19 +174,26 @@ def diagnostic_plots(inf_data, treatment_effect, std):
 
 
 def regression_discontinuity_plot(
-    data, eligibility_threshold, trained_mod, inf_data
+    data, eligibility_threshold, trained_mod, inf_data, positive_slope=True,
+    n_points=500, fast=True, include_y=False
 ):
 
     """
     Plots linear regression lines on top of data_scatterplot function to illustrate
-    regression discontinuity effects. Samples posterior data from by train_model function
-    in model.py to construct high density interval from our regression lines.
+    regression discontinuity effects. Computes the high density interval of our regression
+    lines from the posterior samples of the train_model function in model.py.
 
     INPUTS
     ------
     - df: data generated from dataset.py
     - trained_mod: our model trained in model.py
     - inf_data: our inference data generated in model.py
+    - positive_slope: same value passed to train_model
+    - n_points: number of points used to draw the lines
+    - fast: if True, compute the intervals directly from the posterior samples of effect,
+    otherwise, sample them with pm.sample_posterior_predictive
+    - include_y: also plot the high density interval of the observations (y), this
+    requires sampling with pm.sample_posterior_predictive
 
     OUTPUT
     ------
@@ -109,13 +204,12 @@ def regression_discontinuity_plot(
     sns.set_style("darkgrid")
 
     # instantiate data for future sampling
-    mu_x = np.linspace(np.min(data.X), np.max(data.X), 500)
-    lab_treated = np.zeros(mu_x.shape)
+    mu_x = np.linspace(np.min(data.X), np.max(data.X), n_points)
 
-    # use aliases found in model.py file for lines
-    with trained_mod:
-        pm.set_data({"x_vals": mu_x, "treated_obs": lab_treated})
-        ppc = pm.sample_posterior_predictive(inf_data, var_names=["mu", "y"])
+    if fast:
+        hdi_untreated, hdi_treated = mu_hdi_bands(inf_data, mu_x, positive_slope)
+    else:
+        hdi_untreated, hdi_treated = mu_hdi_bands_sampled(trained_mod, inf_data, mu_x)
 
     # scatterplot for treatment,control,eligibility threshold
     ax = data_scatterplot(data, eligibility_threshold)
@@ -123,31 +217,83 @@ def regression_discontinuity_plot(
     # plot control group's regression line, labels for mu
     az.plot_hdi(
         mu_x,
-        ppc.posterior_predictive["mu"],
+        hdi_data=hdi_untreated,
         color="C1",
-        hdi_prob=0.95,
         ax=ax,
         fill_kwargs={"label": r"$\mu$ untreated (Counterfactual)"},
     )
 
-    # instantiate data for future sampling
-    mu_x = np.linspace(np.min(data.X), np.max(data.X), 500)
-    lab_treated = np.ones(mu_x.shape)
-
-    # use aliases found in model.py file
-    with trained_mod:
-        pm.set_data({"x_vals": mu_x, "treated_obs": lab_treated})
-        ppc = pm.sample_posterior_predictive(inf_data, var_names=["mu", "y"])
-
     # plot treatment's regression line, labels for mu
     az.plot_hdi(
         mu_x,
-        ppc.posterior_predictive["mu"],
+        hdi_data=hdi_treated,
         color="C0",
-        hdi_prob=0.95,
         ax=ax,
         fill_kwargs={"label": r"$\mu$ treated (Actual Trend)"},
     )
 
+    if include_y:
+        y_untreated, y_treated = _sample_both_groups(trained_mod, inf_data, mu_x, "y")
+
+        for y, color, label in [(y_untreated, "C1", "untreated"), (y_treated, "C0", "treated")]:
+            az.plot_hdi(
+                mu_x,
+                y,
+                color=color,
+                hdi_prob=0.95,
+                ax=ax,
+                fill_kwargs={"alpha": 0.15, "label": f"$y$ {label}"},
+            )
+
     plt.legend()
     plt.show()
+
+
+def mu_hdi_bands(inf_data, mu_x, positive_slope=True, hdi_prob=0.95):
+
+    """
+    Compute the high density interval of mu for the untreated and treated groups
+    directly from the posterior samples of effect.
+
+    mu is (+/-) x + effect * treated, for a fixed x, it is the posterior of effect
+    shifted by a constant, so its interval is the interval of effect shifted by the same
+    constant. This only requires computing one interval, regardless of the number of points.
+
+    OUTPUT
+    ------
+    (untreated, treated): arrays with shape (len(mu_x), 2) with the lower and upper bounds
+    """
+    line = mu_x if positive_slope else -mu_x
+    # flatten the (chain, draw) samples, az.hdi reads 2-D arrays as (draw, shape)
+    effect_hdi = az.hdi(inf_data.posterior["effect"].values.ravel(), hdi_prob=hdi_prob)
+
+    untreated = np.column_stack([line, line])
+    treated = line[:, np.newaxis] + effect_hdi[np.newaxis, :]
+
+    return untreated, treated
+
+
+def mu_hdi_bands_sampled(trained_mod, inf_data, mu_x, hdi_prob=0.95):
+
+    """
+    Same as mu_hdi_bands but sampling mu with pm.sample_posterior_predictive
+    (slower, but it works with any model)
+    """
+    mu_untreated, mu_treated = _sample_both_groups(trained_mod, inf_data, mu_x, "mu")
+    return (az.hdi(mu_untreated.values, hdi_prob=hdi_prob),
+            az.hdi(mu_treated.values, hdi_prob=hdi_prob))
+
+
+def _sample_both_groups(trained_mod, inf_data, mu_x, var_name):
+    # sample the untreated and treated groups in a single pass: the first half of the
+    # points are untreated, the second half are treated
+    x_vals = np.concatenate([mu_x, mu_x])
+    lab_treated = np.concatenate([np.zeros(mu_x.shape), np.ones(mu_x.shape)])
+
+    # use aliases found in model.py file
+    with trained_mod:
+        pm.set_data({"x_vals": x_vals, "treated_obs": lab_treated})
+        ppc = pm.sample_posterior_predictive(inf_data, var_names=[var_name])
+
+    samples = ppc.posterior_predictive[var_name]
+    return samples[..., :len(mu_x)], samples[..., len(mu_x):]
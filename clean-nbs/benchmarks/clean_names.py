@@ -0,0 +1,28 @@
+"""
+Compare clean_name (applied row by row) with clean_names (vectorized)
+
+Usage:
+
+    python benchmarks/clean_names.py
+"""
+from time import perf_counter
+
+import pandas as pd
+
+from my_package.process import clean_name, clean_names
+
+if __name__ == '__main__':
+    names = pd.Series(['Hemingway, Ernest', 'virginia woolf',
+                       'charles dickens   '] * 1_000_000)
+
+    start = perf_counter()
+    expected = names.apply(clean_name)
+    apply = perf_counter() - start
+
+    start = perf_counter()
+    result = clean_names(names)
+    vectorized = perf_counter() - start
+
+    assert result.tolist() == expected.tolist()
+    print(f'{len(names):,} names. apply: {apply:.2f} s, '
+          f'vectorized: {vectorized:.2f} s')
@@ -1,3 +1,11 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ascii characters removed by str.strip()
+_WHITESPACE = ''.join(chr(i) for i in range(128) if chr(i).isspace())
+
+
 # example of a function that does not mutate its input
 def add_one_to_series(series):
     """Adds one to a series
@@ -32,3 +40,45 @@ def clean_name(name):
     last_clean = last.strip().capitalize()
 
     return f'{first_clean} {last_clean}'
+
+
+def clean_names(names):
+    """Clean a pandas.Series of name strings, vectorized version of clean_name
+    """
+    names_arr = pa.array(names, type=pa.string(), from_pandas=True)
+    # arrow's unicode case mapping differs from python's for a few
+    # characters, so non-ascii names go through clean_name
+    is_ascii = pc.fill_null(pc.string_is_ascii(names_arr), True)
+    # flip if in last name, first name format
+    has_comma = pc.equal(pc.count_substring(names_arr, ','), 1)
+    flip = pc.and_(pc.fill_null(has_comma, False), is_ascii)
+    space = pc.and_(pc.invert(flip), is_ascii)
+    other = pc.invert(is_ascii)
+
+    tokens = pc.split_pattern(pc.filter(names_arr, flip), ',')
+    words = pc.split_pattern(pc.filter(names_arr, space), ' ', max_splits=2)
+
+    if pc.any(pc.less(pc.list_value_length(words), 2)).as_py():
+        raise ValueError('Cannot clean names without a comma or a space')
+
+    flipped = _join_clean(pc.list_element(tokens, 1),
+                          pc.list_element(tokens, 0))
+    spaced = _join_clean(pc.list_element(words, 0), pc.list_element(words, 1))
+    others = pa.array(
+        [clean_name(name) for name in pc.filter(names_arr, other).to_pylist()],
+        type=pa.string())
+
+    # put each group back in its original position (nulls stay as nulls)
+    clean = pa.nulls(len(names_arr), type=pa.string())
+
+    for mask, values in [(flip, flipped), (space, spaced), (other, others)]:
+        clean = pc.replace_with_mask(clean, mask, values)
+
+    return pd.Series(clean.to_pandas(), index=names.index, name=names.name)
+
+
+def _join_clean(first, last):
+    # remove punctuation (same characters as str.strip) and capitalize
+    first_clean = pc.ascii_capitalize(pc.ascii_trim(first, _WHITESPACE))
+    last_clean = pc.ascii_capitalize(pc.ascii_trim(last, _WHITESPACE))
+    return pc.binary_join_element_wise(first_clean, last_clean, ' ')
@@ -0,0 +1,107 @@
+import queue
+from itertools import count
+from pathlib import Path
+from threading import Event, Thread
+
+import pandas as pd
+
+_DONE = object()
+
+
+def process_chunks(chunks, fn, write, max_queue_size=2):
+    """Apply fn to each chunk and pass the results (in order) to write
+
+    Reading (iterating over chunks), processing and writing happen at the
+    same time: chunks are read in a thread and written in another one,
+    connected by queues of at most max_queue_size chunks, so memory usage
+    depends on the chunk size, not on the size of the data
+    """
+    to_process = queue.Queue(maxsize=max_queue_size)
+    to_write = queue.Queue(maxsize=max_queue_size)
+    stop = Event()
+    errors = []
+
+    def read():
+        try:
+            for chunk in chunks:
+                if not _put(to_process, chunk, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(to_process, _DONE, stop)
+
+    def write_all():
+        while True:
+            result = to_write.get()
+
+            if result is _DONE:
+                return
+
+            # if writing failed, keep consuming so the main thread does
+            # not block
+            if not errors:
+                try:
+                    write(result)
+                except Exception as e:
+                    errors.append(e)
+
+    reader = Thread(target=read, daemon=True)
+    writer = Thread(target=write_all, daemon=True)
+    reader.start()
+    writer.start()
+
+    try:
+        while not errors:
+            chunk = to_process.get()
+
+            if chunk is _DONE:
+                break
+
+            to_write.put(fn(chunk))
+    finally:
+        stop.set()
+        to_write.put(_DONE)
+        writer.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _put(q, item, stop):
+    # put item in the queue, unless we are asked to stop
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        else:
+            return True
+
+    return False
+
+
+def write_partitions(path):
+    """Returns a function that writes each data frame it receives as a new
+    parquet file (part-00000.parquet, part-00001.parquet, ...) in path
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    # remove partitions from previous runs
+    for old in path.glob('part-*.parquet'):
+        old.unlink()
+
+    counter = count()
+
+    def write(df):
+        df.to_parquet(path / f'part-{next(counter):05d}.parquet', index=False)
+
+    return write
+
+
+def read_partitions(path):
+    """Yield the data frames written by write_partitions, in order
+    """
+    for part in sorted(Path(path).glob('part-*.parquet')):
+        yield pd.read_parquet(part)
@@ -13,18 +13,29 @@
 # ---
 import pandas as pd
 
-from my_package.process import clean_name
+from my_package.process import clean_names
+from my_package.stream import process_chunks, write_partitions
 
 # %% tags=["parameters"]
 upstream = ['load']
 product = None
+# if not None, process the data in chunks of this size and save it as
+# parquet partitions
+chunksize = None
 
-# %%
-df = pd.read_csv(upstream['load']['data'])
 
 # %%
-df['name'] = df.name.apply(clean_name)
-df['years_since_birth'] = 2021 - df['birth_year']
+def clean(df):
+    df['name'] = clean_names(df.name)
+    df['years_since_birth'] = 2021 - df['birth_year']
+    return df
+
 
 # %%
-df.to_csv(product['data'], index=False)
\ No newline at end of file
+if chunksize is None:
+    df = clean(pd.read_csv(upstream['load']['data']))
+    df.to_csv(product['data'], index=False)
+else:
+    # read, clean and write chunks at the same time
+    chunks = pd.read_csv(upstream['load']['data'], chunksize=chunksize)
+    process_chunks(chunks, clean, write_partitions(product['data']))
\ No newline at end of file
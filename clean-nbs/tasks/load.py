@@ -26,4 +26,5 @@ df = pd.DataFrame({
 })
 
 # %%
-df.to_csv(product['data'], index=False)
\ No newline at end of file
+# write in chunks so we do not build the whole file in memory
+df.to_csv(product['data'], index=False, chunksize=100_000)
\ No newline at end of file
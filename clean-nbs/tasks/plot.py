@@ -15,17 +15,29 @@
 # %%
 import pandas as pd
 
-from my_package.process import clean_name
+from my_package.stream import read_partitions
 
 # %% tags=["parameters"]
 upstream = ['clean']
 product = None
+# if True, the clean task saved the data as parquet partitions, we
+# aggregate them one at a time
+chunked = False
 
 # %%
-df = pd.read_csv(upstream['clean']['data'])
+if not chunked:
+    df = pd.read_csv(upstream['clean']['data'])
+    years = df.set_index('name').years_since_birth
+else:
+    total = pd.Series(dtype=float)
+    count = pd.Series(dtype=float)
 
-# %%
-df = df.set_index('name')
+    for part in read_partitions(upstream['clean']['data']):
+        grouped = part.groupby('name').years_since_birth
+        total = total.add(grouped.sum(), fill_value=0)
+        count = count.add(grouped.count(), fill_value=0)
+
+    years = total / count
 
 # %%
-df.years_since_birth.plot(kind='barh')
+years.plot(kind='barh')
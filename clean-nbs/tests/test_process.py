@@ -1,3 +1,6 @@
+import random
+
+import pandas as pd
 import pytest
 from my_package import process
 
@@ -12,3 +15,29 @@ from my_package import process
 )
 def test_clean_name(name, expected):
     assert process.clean_name(name) == expected
+
+
+def test_clean_names_matches_clean_name():
+    rng = random.Random(0)
+    alphabet = 'abcXYZ ,\t\x1c\xe9\xdf'
+    names = [
+        ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        for _ in range(5000)
+    ]
+
+    valid, invalid = [], []
+
+    for name in names:
+        try:
+            process.clean_name(name)
+        except ValueError:
+            invalid.append(name)
+        else:
+            valid.append(name)
+
+    expected = [process.clean_name(name) for name in valid]
+    assert process.clean_names(pd.Series(valid)).tolist() == expected
+
+    for name in invalid:
+        with pytest.raises(ValueError):
+            process.clean_names(pd.Series([name]))
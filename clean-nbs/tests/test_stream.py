@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from my_package import stream
+
+
+def test_process_chunks_keeps_order():
+    results = []
+    stream.process_chunks(range(100), lambda x: x * 2, results.append)
+    assert results == [x * 2 for x in range(100)]
+
+
+@pytest.mark.parametrize('where', ['read', 'process', 'write'])
+def test_process_chunks_raises_errors(where):
+    def chunks():
+        yield from range(10)
+
+        if where == 'read':
+            raise ValueError('read')
+
+    def fn(x):
+        if where == 'process' and x == 5:
+            raise ValueError('process')
+        return x
+
+    def write(x):
+        if where == 'write' and x == 5:
+            raise ValueError('write')
+
+    with pytest.raises(ValueError, match=where):
+        stream.process_chunks(chunks(), fn, write, max_queue_size=1)
+
+
+def test_write_and_read_partitions(tmp_path):
+    write = stream.write_partitions(tmp_path / 'data')
+
+    for i in range(3):
+        write(pd.DataFrame({'x': [i, i]}))
+
+    df = pd.concat(stream.read_partitions(tmp_path / 'data'))
+    assert df.x.tolist() == [0, 0, 1, 1, 2, 2]
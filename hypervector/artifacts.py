@@ -0,0 +1,24 @@
+"""
+Save and load model artifacts with joblib. Numpy arrays are written as raw
+buffers, so they can be memory-mapped when loading instead of copied
+"""
+import joblib
+
+
+def save_model(model, path):
+    """Save a model (uncompressed, so it can be memory-mapped)
+    """
+    joblib.dump(model, path)
+
+
+def load_model(path, mmap_mode='r'):
+    """
+    Load a model. With mmap_mode='r', numpy arrays are read-only views of
+    the file, so processes loading the same file share the page cache
+
+    Notes
+    -----
+    Some objects copy their arrays when unpickled (e.g. scikit-learn trees
+    copy their nodes), those arrays are not shared
+    """
+    return joblib.load(path, mmap_mode=mmap_mode)
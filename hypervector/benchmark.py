@@ -0,0 +1,35 @@
+"""
+Build the pipeline with a scaled version of the iris dataset and print
+how long each task took
+
+Usage:
+
+    python benchmark.py --n-rows 100000000
+"""
+from argparse import ArgumentParser
+from tempfile import TemporaryDirectory
+
+from ploomber.spec import DAGSpec
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--n-rows', type=int, default=100_000_000)
+    # training a random forest with 100M rows takes too long, so we train
+    # with a sample by default
+    parser.add_argument('--max-train-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    # record reference values from the scaled dataset in a temporary
+    # directory so we do not overwrite the ones in reference/
+    with TemporaryDirectory() as reference:
+        dag = DAGSpec('pipeline.yaml',
+                      env={
+                          'test': False,
+                          'reference': reference,
+                          'n_rows': args.n_rows,
+                          'max_train_rows': args.max_train_rows
+                      }).to_dag()
+
+        report = dag.build(force=True)
+
+    print(report)
@@ -0,0 +1,53 @@
+"""
+Compare loading a 500-tree random forest with pickle and with
+artifacts.load_model. Each load runs in a new process to measure its
+peak resident memory
+
+Usage:
+
+    python benchmark_artifacts.py
+"""
+import pickle
+import resource
+import sys
+from pathlib import Path
+from subprocess import run
+from time import perf_counter
+
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+from artifacts import load_model, save_model
+
+PICKLE = Path('products', 'benchmark-model.pickle')
+JOBLIB = Path('products', 'benchmark-model.joblib')
+
+
+def load(kind):
+    start = perf_counter()
+
+    if kind == 'pickle':
+        pickle.loads(PICKLE.read_bytes())
+    else:
+        load_model(JOBLIB)
+
+    elapsed = perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{kind}: {elapsed:.2f} s, peak memory: {peak:.0f} MB')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        load(sys.argv[1])
+    else:
+        X, y = make_classification(n_samples=100_000, random_state=0)
+        model = RandomForestClassifier(n_estimators=500, n_jobs=-1,
+                                       random_state=0).fit(X, y)
+
+        PICKLE.parent.mkdir(exist_ok=True)
+        PICKLE.write_bytes(pickle.dumps(model))
+        save_model(model, JOBLIB)
+
+        for kind in ['pickle', 'joblib']:
+            run([sys.executable, __file__, kind], check=True)
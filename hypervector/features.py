@@ -0,0 +1,60 @@
+"""
+Feature tasks, each one reads only the columns it needs from the output of
+the get task
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+def load_training_data(get, features):
+    """
+    Load the output of the get task and add the feature columns, returns a
+    pandas.DataFrame. Columns are appended to the Arrow table without
+    copying them, converting it to pandas makes a single copy
+    """
+    table = pq.read_table(get)
+
+    for path in features:
+        feature = pq.read_table(path)
+        table = table.append_column(feature.field(0), feature.column(0))
+
+    return table.to_pandas()
+
+
+def load_training_sample(get, features, n_samples):
+    """
+    Like load_training_data, but only loads n_samples evenly spaced rows,
+    the rest of the data is never converted to pandas
+    """
+    n_rows = pq.ParquetFile(get).metadata.num_rows
+    indices = np.unique(
+        np.linspace(0, n_rows - 1, min(n_samples, n_rows)).astype(np.int64))
+
+    table = ds.dataset(get).take(indices)
+
+    for path in features:
+        feature = ds.dataset(path).take(indices)
+        table = table.append_column(feature.field(0), feature.column(0))
+
+    return table.to_pandas()
+
+
+def _area(path, product, length, width, name):
+    table = pq.read_table(path, columns=[length, width])
+    area = pc.multiply(table[length], table[width])
+    pq.write_table(pa.table({name: area}), product)
+
+
+# ploomber finds the dependencies of each task by looking for upstream['...']
+# in the function's source code, so they must be referenced here (not in _area)
+def petal_area(upstream, product):
+    _area(upstream['get']['data'], product, 'petal length (cm)',
+          'petal width (cm)', 'petal-area')
+
+
+def sepal_area(upstream, product):
+    _area(upstream['get']['data'], product, 'sepal length (cm)',
+          'sepal width (cm)', 'sepal-area')
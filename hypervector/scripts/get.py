@@ -12,6 +12,7 @@
 #     name: python3
 # ---
 
+import numpy as np
 import pandas as pd
 from sklearn.datasets import load_iris
 
@@ -21,6 +22,9 @@ from sklearn.datasets import load_iris
 # leave as None
 upstream = None
 
+# if not None, repeat the rows until reaching n_rows
+n_rows = None
+
 # extract_product=False in your pipeline.yaml file, leave this as None, the
 # value in the YAML spec  will be added here during task execution
 product = None
@@ -29,6 +33,11 @@ product = None
 
 df = load_iris(as_frame=True)['frame']
 
+if n_rows is not None:
+    df = df.iloc[np.arange(n_rows) % len(df)].reset_index(drop=True)
+
 df.head()
 
-df.to_csv(product['data'], index=False)
+# parquet is a columnar format, so downstream tasks can read only the
+# columns they need
+df.to_parquet(product['data'], index=False)
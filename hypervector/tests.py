@@ -1,13 +1,89 @@
 from pathlib import Path
-import pickle
 
+import numpy as np
+import pandas as pd
 
-def predictions(test, product):
-    model = pickle.loads(Path(product['model']).read_bytes())
+from artifacts import load_model
+from features import load_training_sample
+
+
+def predictions(test, product, task, reference='reference', n_samples=1000,
+                atol=1e-6):
+    """
+    Record (test=False) or check (test=True) the model's output on a sample
+    of the training data. Only the sample is loaded and scored, so this takes
+    the same time regardless of the dataset size
+    """
+    model = load_model(product['model'])
+    reference = Path(reference)
 
     # check output against recorded output...
     if test:
         print('checking output against reference values...')
+        check_reference(model, reference, atol=atol)
     # record output...
     else:
         print('recording reference values...')
+        upstream = task.upstream
+        features = [
+            str(upstream[name].product)
+            for name in ['petal-area', 'sepal-area']
+        ]
+        sample = load_training_sample(str(upstream['get'].product['data']),
+                                      features,
+                                      n_samples=n_samples)
+        X = sample.drop('target', axis='columns')
+        record_reference(model, X, reference)
+
+
+def _hash_rows(X):
+    return pd.util.hash_pandas_object(X, index=False).to_numpy()
+
+
+def record_reference(model, sample, reference):
+    """
+    Store a sample of rows with the model's predictions and probabilities,
+    and a hash of each row to detect if the stored sample gets corrupted
+    """
+    reference.mkdir(parents=True, exist_ok=True)
+    np.save(reference / 'columns.npy', np.array(sample.columns, dtype=str))
+    np.save(reference / 'X.npy', sample.to_numpy())
+    np.save(reference / 'hashes.npy', _hash_rows(sample))
+    np.save(reference / 'y_pred.npy', model.predict(sample))
+    np.save(reference / 'y_proba.npy', model.predict_proba(sample))
+
+
+def check_reference(model, reference, atol=1e-6):
+    """
+    Score the stored sample and compare it with the recorded values, raises
+    an AssertionError listing the rows that changed
+    """
+    if not reference.is_dir():
+        raise FileNotFoundError(
+            f'There are no reference values in {str(reference)!r}, record '
+            'them first with: ploomber build --env--test false')
+
+    columns = np.load(reference / 'columns.npy')
+    sample = pd.DataFrame(np.load(reference / 'X.npy'), columns=columns)
+
+    if not np.array_equal(_hash_rows(sample),
+                          np.load(reference / 'hashes.npy')):
+        raise ValueError(f'Reference data in {reference} is corrupted')
+
+    y_pred = model.predict(sample)
+    y_proba = model.predict_proba(sample)
+
+    same_pred = y_pred == np.load(reference / 'y_pred.npy')
+    same_proba = np.isclose(y_proba,
+                            np.load(reference / 'y_proba.npy'),
+                            rtol=0,
+                            atol=atol).all(axis=1)
+    drifted = ~(same_pred & same_proba)
+
+    if drifted.any():
+        rows = np.flatnonzero(drifted)
+        raise AssertionError(
+            f'{len(rows)} out of {len(sample)} reference rows changed, '
+            f'rows: {rows.tolist()}\n{sample.iloc[rows]}')
+
+    print(f'all {len(sample)} reference rows match')
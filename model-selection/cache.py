@@ -0,0 +1,153 @@
+import os
+from pathlib import Path
+
+import joblib
+from sklearn.base import BaseEstimator, clone
+
+
+class FitCache:
+    """
+    Store fitted estimators on disk, the key is determined by the
+    estimator class, its parameters and the training data
+
+    Parameters
+    ----------
+    path : str
+        Directory to store the fitted estimators
+    max_bytes : int, optional
+        Maximum size of the cache, when exceeded, the least recently used
+        estimators are deleted. Defaults to 1 GB
+
+    Notes
+    -----
+    hits and misses are counted in the current process only
+    """
+
+    def __init__(self, path, max_bytes=1024**3):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def key(self, estimator, X, y=None):
+        # joblib.hash hashes the full content of arrays and data frames
+        # (including object columns), unlike repr, which truncates them
+        return joblib.hash(
+            (class_path(estimator), params_key(estimator), X, y))
+
+    def get(self, key):
+        path = self.path / (key + '.joblib')
+
+        try:
+            estimator = joblib.load(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        # update the modification time, we use it to evict the
+        # least recently used estimators
+        os.utime(path)
+        self.hits += 1
+        return estimator
+
+    def put(self, key, estimator):
+        path = self.path / (key + '.joblib')
+        # write to a temporary file first so other processes never
+        # load a partially written file
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        joblib.dump(estimator, tmp)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        files = []
+
+        for path in self.path.glob('*.joblib'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # another process deleted it
+                continue
+
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_caches = {}
+
+
+def get_cache(path, max_bytes=1024**3):
+    """Return the FitCache for path (one per process)
+    """
+    key = (str(path), max_bytes)
+
+    if key not in _caches:
+        _caches[key] = FitCache(path, max_bytes=max_bytes)
+
+    return _caches[key]
+
+
+def class_path(obj):
+    return f'{type(obj).__module__}.{type(obj).__name__}'
+
+
+def params_key(estimator):
+    # sub-estimators are represented by their class, their parameters are
+    # already in the deep params
+    params = estimator.get_params(deep=True)
+    return sorted(((name, class_path(value) if hasattr(value, 'get_params')
+                    else value) for name, value in params.items()),
+                  key=lambda item: item[0])
+
+
+class CachedEstimator(BaseEstimator):
+    """
+    Wraps an estimator, fit loads a previously fitted estimator if there
+    is one for the same parameters and data. Use it in GridSearchCV
+    (parameters are prefixed with estimator__) to reuse inner-fold fits
+
+    Parameters
+    ----------
+    estimator
+        The estimator to fit
+    cache_dir : str, optional
+        Where to store fitted estimators, defaults to 'cache'
+    max_bytes : int, optional
+        Maximum size of the cache, defaults to 1 GB
+    """
+
+    def __init__(self, estimator=None, cache_dir='cache', max_bytes=1024**3):
+        self.estimator = estimator
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @property
+    def _estimator_type(self):
+        return getattr(self.estimator, '_estimator_type', None)
+
+    def fit(self, X, y=None):
+        cache = get_cache(self.cache_dir, max_bytes=self.max_bytes)
+        key = cache.key(self.estimator, X, y)
+        fitted = cache.get(key)
+
+        if fitted is None:
+            fitted = clone(self.estimator).fit(X, y)
+            cache.put(key, fitted)
+
+        self.estimator_ = fitted
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def score(self, X, y):
+        return self.estimator_.score(X, y)
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import numpy as np
+from sklearn.datasets import load_boston
+from sklearn.model_selection import KFold
+
+
+def get_data(product, n_outer=5, n_inner=5):
+    """
+    Save the dataset and the cross-validation folds as .npy files so
+    every report uses the same data and splits without recomputing them
+
+    Notes
+    -----
+    outer.npy has the outer fold for each observation. inner.npy has
+    one row per outer fold with the inner fold for each observation
+    (-1 for observations in the outer test set)
+    """
+    dataset = load_boston()
+    X, y = dataset.data, dataset.target
+
+    outer = np.empty(len(y), dtype=int)
+    inner = np.full((n_outer, len(y)), -1, dtype=int)
+
+    for i, (train, test) in enumerate(KFold(n_splits=n_outer).split(X)):
+        outer[test] = i
+
+        for j, (_, inner_test) in enumerate(
+                KFold(n_splits=n_inner).split(train)):
+            inner[i, train[inner_test]] = j
+
+    Path(str(product['X'])).parent.mkdir(parents=True, exist_ok=True)
+    np.save(str(product['X']), X)
+    np.save(str(product['y']), y)
+    np.save(str(product['outer']), outer)
+    np.save(str(product['inner']), inner)
@@ -0,0 +1,130 @@
+import importlib
+import json
+import time
+from pathlib import Path
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, PredefinedSplit
+from sklearn.pipeline import Pipeline
+import numpy as np
+import pandas as pd
+
+from cache import CachedEstimator, get_cache
+
+# + tags=["parameters"]
+m_init = None
+m_params = None
+# 'grid' (exhaustive), 'halving' (successive halving) or 'path' (the
+# estimator tunes itself, e.g. RidgeCV computes the whole alpha path)
+m_search = 'grid'
+m_search_kwargs = None
+# number of cores for the search
+n_jobs = -1
+# if not None, directory to cache fitted models
+m_cache = None
+upstream = None
+product = None
+# -
+
+print('Model: ', m_init)
+print('Params: ', m_params)
+print('Search: ', m_search, m_search_kwargs)
+
+# +
+# m_init is module.sub_module.constructor import it from the string
+parts = m_init.split('.')
+mod_str, constructor = '.'.join(parts[:-1]), parts[-1]
+mod = importlib.import_module(mod_str)
+
+# instantiate it
+model = getattr(mod, constructor)()
+
+# if caching, wrap the model so fits with the same parameters and data
+# (including the ones in the inner folds) are loaded from disk
+if m_cache:
+    model = CachedEstimator(model, cache_dir=m_cache)
+    m_params = {f'estimator__{key}': value for key, value in m_params.items()}
+
+print(model)
+# -
+
+# load data and folds computed by the upstream task, we memory-map
+# them so tasks running at the same time share a single copy
+data = upstream['data']
+X = np.load(data['X'], mmap_mode='r')
+y = np.load(data['y'], mmap_mode='r')
+outer = np.load(data['outer'])
+inner = np.load(data['inner'])
+
+# +
+search_kwargs = m_search_kwargs or {}
+
+if m_search == 'grid':
+    # Perform grid search over the passed parameters
+    grid = GridSearchCV(model, m_params, n_jobs=n_jobs, **search_kwargs)
+elif m_search == 'halving':
+    # successive halving: evaluate all candidates with a small budget,
+    # keep the best ones and increase the budget
+    from sklearn.experimental import enable_halving_search_cv  # noqa
+    from sklearn.model_selection import HalvingGridSearchCV
+    grid = HalvingGridSearchCV(model, m_params, n_jobs=n_jobs, **search_kwargs)
+elif m_search == 'path':
+    # the model selects its own hyperparameters, no grid search needed.
+    # search_kwargs are passed to the model, so they need the same prefix as
+    # m_params if it is wrapped
+    if m_cache:
+        search_kwargs = {
+            f'estimator__{key}': value
+            for key, value in search_kwargs.items()
+        }
+
+    grid = model.set_params(**m_params, **search_kwargs)
+else:
+    raise ValueError(f'Unknown search strategy: {m_search}')
+
+
+def selected_params(est):
+    if hasattr(est, 'best_params_'):
+        return {key.replace('estimator__', '', 1): value
+                for key, value in est.best_params_.items()}
+
+    est = getattr(est, 'estimator_', est)
+    final = est[-1] if isinstance(est, Pipeline) else est
+    return {'alpha_': final.alpha_} if hasattr(final, 'alpha_') else {}
+
+
+# We want to estimate generalization performance *and* tune hyperparameters
+# so we are using nested cross-validation. This is what cross_val_predict
+# does, but we run the outer loop ourselves to keep the selected
+# hyperparameters on each fold and to use the precomputed folds
+y_pred = np.empty(len(y))
+best_params = []
+start = time.perf_counter()
+
+for i in range(inner.shape[0]):
+    train, test = np.flatnonzero(outer != i), np.flatnonzero(outer == i)
+    est = clone(grid)
+
+    if 'cv' in est.get_params(deep=False):
+        est.set_params(cv=PredefinedSplit(inner[i, train]))
+
+    fitted = est.fit(X[train], y[train])
+    y_pred[test] = fitted.predict(X[test])
+    best_params.append(selected_params(fitted))
+
+wall_time = time.perf_counter() - start
+print(f'Wall time: {wall_time:.2f} s')
+
+if m_cache:
+    # only counts fits in this process (not the ones in n_jobs workers)
+    cache = get_cache(m_cache)
+    print(f'Cache hits: {cache.hits}, misses: {cache.misses}')
+
+pd.DataFrame(best_params)
+# -
+
+# save predictions and a summary of the search, the evaluation task
+# uses them
+np.save(product['predictions'], y_pred)
+summary = {'model': m_init, 'search': m_search, 'wall_time': wall_time,
+           'best_params': best_params}
+Path(product['summary']).write_text(json.dumps(summary, default=str))
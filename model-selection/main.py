@@ -11,11 +11,14 @@
 #
 # ## Project layout
 #
-# We split the code in three files:
+# We split the code in six files:
 #
 # 1. `pipelines.py`. Contains functions to instantiate scikit-learn pipelines
-# 2. `report.py`. Contains the source code that performs hyperparameter tuning and model evaluation, imports pipelines defined in `pipelines.py`
-# 3. `main.py`. Contains the loop that executes `report.py` for each pipeline using ploomber
+# 2. `cache.py`. Contains a wrapper that caches fitted models
+# 3. `data.py`. Contains a function that saves the dataset and the cross-validation folds
+# 4. `fit.py`. Contains the source code that performs hyperparameter tuning and saves the predictions, imports pipelines defined in `pipelines.py`
+# 5. `report.py`. Contains the source code that evaluates the predictions
+# 6. `main.py`. Contains the loop that executes `fit.py` and `report.py` for each pipeline using ploomber
 #
 # Unless otherwise noted, the snippets shown in this post belong to `main.py`.
 #
@@ -27,9 +30,27 @@
 #
 # We have one factory for NuSVR and another one Ridge Regression. Since these two models are sensitive to scaling, we include them in a scikit-learn pipeline that scales all features before feeding the data into the model.
 #
-# ## Hyperparameter tuning and performance estimation (`report.py`)
+# ## Caching fitted models (`cache.py`)
 #
-# We will process each model separately, generating three HTML reports in total, the reports will be generated using the following source code:
+# When iterating on our reports, we often train the same models on the same data again. `CachedEstimator` wraps a model and stores it on disk after fitting it, the file name is a hash of the model's class, its parameters and the training data so calling `fit` again with the same inputs just loads the model. Since it is a scikit-learn estimator, we can use it inside `GridSearchCV`, so fits in the inner folds are cached as well. Least recently used models are deleted when the cache exceeds `max_bytes`:
+#
+# {{expand('cache.py')}}
+#
+# ## Dataset and cross-validation folds (`data.py`)
+#
+# All our reports use the same data and the same folds, instead of loading the data and computing the folds in every report, we do it once and save them as `.npy` files, the reports load them in memory-mapped mode so they share a single copy when running at the same time:
+#
+# {{expand('data.py')}}
+#
+# ## Hyperparameter tuning and performance estimation (`fit.py`)
+#
+# We will process each model separately. First, we tune hyperparameters and generate predictions using nested cross-validation, predictions are saved so we do not have to re-train models if we only want to change the evaluation:
+#
+# {{expand('fit.py')}}
+#
+# ## Evaluation (`report.py`)
+#
+# Then, we generate one HTML report for each model (three in total) using the following source code:
 #
 # {{expand('report.py')}}
 #
@@ -41,16 +62,20 @@
 # +
 from pathlib import Path
 
-from ploomber.tasks import NotebookRunner
+from ploomber.tasks import NotebookRunner, PythonCallable
 from ploomber.products import File
+from ploomber.executors import Parallel
 from ploomber import DAG
 
+from data import get_data
+
 # Ridge Regression grid
 params_ridge = {
     'm_init': 'pipelines.ridge',
     'm_params': {
         'reg__alpha': [0.5, 1.0, 1.5, 2.0, 3.0]
-    }
+    },
+    'm_search': 'grid',
 }
 
 # Random Forest Regression grid
@@ -59,7 +84,8 @@ params_rf = {
     'm_params': {
         'n_estimators': [5, 50, 100],
         'min_samples_leaf': [5, 10, 20],
-    }
+    },
+    'm_search': 'grid',
 }
 
 # Nu Support Vector Regression grid
@@ -69,16 +95,18 @@ params_nusvr = {
         'reg__nu': [0.3, 0.5, 0.8],
         'reg__C': [0.5, 1.0, 1.5, 2.0],
         'reg__kernel': ['rbf', 'sigmoid']
-    }
+    },
+    'm_search': 'grid',
 }
 # -
 
-# Note that we do not have a pipeline for `RandomForestRegressor`, Random Forest is not sensitive to scaling so we use the model directly.
+# Note that we do not have a pipeline for `RandomForestRegressor`, Random Forest is not sensitive to scaling so we use the model directly. The `m_search` key selects the hyperparameter search strategy, we start with an exhaustive grid search (`GridSearchCV`) and try faster alternatives at the end of this post.
 #
 # We now add the execution loop, we will execute it using [ploomber](https://github.com/ploomber/ploomber). We just have to tell `ploomber` where to load the source code from, which parameters to use on each iteration and where to save the output:
 
 # +
-# load report source code
+# load source code
+notebook_fit = Path('fit.py').read_text()
 notebook = Path('report.py').read_text()
 
 # we will save all notebooks in the artifacts/ folder
@@ -87,27 +115,121 @@ out.mkdir(exist_ok=True)
 
 params_all = {'ridge': params_ridge, 'rf': params_rf, 'nusvr': params_nusvr}
 
-dag = DAG()
-
-# loop over params and create one notebook task for each...
-for name, params in params_all.items():
-    # NotebookRunner is able to execute ipynb files using
-    # papermill under the hood, if the input file has a
-    # different extension (like in our case), it will first
-    # convert it to an ipynb file using jupytext
-    NotebookRunner(notebook,
-                   # save it in artifacts/{name}.html
-                   # NotebookRunner will generate ipynb files by
-                   # default, but you can choose other formats,
-                   # any format supported by the official nbconvert
-                   # package is supported here
-                   product=File(out / (name + '.html')),
-                   dag=dag,
-                   name=name,
-                   # pass the parameters
-                   params=params,
-                   ext_in='py',
-                   kernelspec_name='python3')
+
+def allocate_cores(cores, cpu_budget):
+    """
+    Grant cores to each task without exceeding cpu_budget, if the tasks
+    request more than that, cores are split proportionally (at least one
+    per task). Returns the cores granted to each task and how many tasks
+    can run at the same time without exceeding cpu_budget, whichever tasks
+    the executor picks
+    """
+    requested = sum(cores.values())
+
+    if requested <= cpu_budget:
+        granted = dict(cores)
+    else:
+        granted = {
+            name: max(1, cpu_budget * n // requested)
+            for name, n in cores.items()
+        }
+
+    # the executor may run any tasks at the same time, so we count how many
+    # of the largest grants fit in the budget. Other tasks (data, reports)
+    # use one core, which is never more than the grant they replace
+    processes, used = 0, 0
+
+    for n in sorted(granted.values(), reverse=True):
+        if used + n > cpu_budget:
+            break
+
+        processes, used = processes + 1, used + n
+
+    return granted, max(processes, 1)
+
+
+def make_dag(params_all, out, data_dir=out / 'data', cores=None,
+             cpu_budget=None, cache_dir=out / 'cache'):
+    # if cores is passed, run tasks in parallel and pass the granted
+    # cores to each fit task via n_jobs
+    if cores:
+        granted, processes = allocate_cores(cores, cpu_budget)
+        params_all = {
+            name: {
+                **params, 'n_jobs': granted[name]
+            }
+            for name, params in params_all.items()
+        }
+        dag = DAG(executor=Parallel(processes=processes))
+    else:
+        dag = DAG()
+
+    # fit tasks store fitted models in cache_dir
+    if cache_dir:
+        params_all = {
+            name: {
+                **params, 'm_cache': str(cache_dir)
+            }
+            for name, params in params_all.items()
+        }
+
+    # this task saves the data and folds used by all reports
+    data = PythonCallable(get_data,
+                          product={
+                              key: File(data_dir / (key + '.npy'))
+                              for key in ['X', 'y', 'outer', 'inner']
+                          },
+                          dag=dag,
+                          name='data')
+
+    (out / 'fit').mkdir(exist_ok=True)
+
+    # loop over params and create two notebook tasks for each...
+    for name, params in params_all.items():
+        # NotebookRunner is able to execute ipynb files using
+        # papermill under the hood, if the input file has a
+        # different extension (like in our case), it will first
+        # convert it to an ipynb file using jupytext
+        fit = NotebookRunner(
+            notebook_fit,
+            # we save the executed notebook, the predictions and
+            # a summary with the wall time and selected hyperparameters
+            product={
+                'nb': File(out / 'fit' / (name + '.html')),
+                'predictions': File(out / 'fit' / (name + '.npy')),
+                'summary': File(out / 'fit' / (name + '.json'))
+            },
+            dag=dag,
+            name=name + '-fit',
+            # pass the parameters
+            params=params,
+            ext_in='py',
+            kernelspec_name='python3')
+
+        report = NotebookRunner(
+            notebook,
+            # save it in artifacts/{name}.html
+            # NotebookRunner will generate ipynb files by
+            # default, but you can choose other formats,
+            # any format supported by the official nbconvert
+            # package is supported here
+            product={'nb': File(out / (name + '.html')),
+                     'summary': File(out / (name + '.json'))},
+            dag=dag,
+            name=name,
+            params={'m_init': params['m_init'], 'fit_task': name + '-fit'},
+            ext_in='py',
+            kernelspec_name='python3')
+
+        # fit loads the data saved by the data task, report loads
+        # the data and the predictions
+        data >> fit >> report
+        data >> report
+
+    return dag
+
+
+dag = make_dag(params_all, out)
 # -
 
 # Build the DAG:
@@ -118,13 +240,123 @@ dag.build()
 #
 # Splitting logic into separate files improves readability and maintainability, if we want to add another model we only have to add a new dictionary with the parameter grid, if preprocessing is needed, we just add a factory in `pipelines.py`.
 #
-# Using ploomber provides a concise and clean framework for generating reports, in just a few lines of code, we generated all our reports, however, we made a big simplifications in our `report.py` file: we are loading, training and evaluating in a single source file, if we made even a small change to our charts we would have to re-train every model again. A better approach is to split that logic in several steps, and that scenario is where ploomber is very effective:
+# Using ploomber provides a concise and clean framework for generating reports, in just a few lines of code, we generated all our reports. Note that we split the logic in three steps:
 #
-# 1. Clean raw data (save clean dataset)
+# 1. Load data and compute folds (save dataset and folds)
 # 2. Train model and predict (save predictions)
 # 3. Evaluate predictions
 #
-# If we split each model pipeline in three steps, and run build, we will obtain the same results, now let's say you want to add a new chart, so you modify step 3. All you have to do to update your reports is `dag.build()`, ploomber will figure out that it does not have to re-run steps 1-2 and overwrite the old reports with the new ones.
+# Say you want to add a new chart, so you modify step 3. All you have to do to update your reports is `dag.build()`, ploomber keeps track of the source code and parameters of each task, so it will figure out that it does not have to re-run steps 1-2 and overwrite the old reports with the new ones. Similarly, if we change `m_params` for one model, only that model's fit and report tasks run again:
+
+# +
+params_changed = {
+    **params_all, 'ridge': {
+        **params_ridge, 'm_params': {
+            'reg__alpha': [0.5, 1.0, 1.5, 2.0, 3.0, 5.0]
+        }
+    }
+}
+make_dag(params_changed, out).status()
+# -
+#
+# ## Running reports in parallel
+#
+# Our DAG executes reports one at a time, but each one uses all cores (`n_jobs=-1`) only during the grid search, so cores are idle a good portion of the time. If we run the reports in parallel with `n_jobs=-1`, we oversubscribe the CPU (each report tries to use all cores). Instead, each task declares how many cores it needs, `allocate_cores` grants them so we stay within our budget and `make_dag` passes the granted cores to each report:
+
+# +
+import os
+import time
+
+# ridge is fast, the other two models benefit from more cores
+cores = {'ridge': 2, 'rf': 8, 'nusvr': 8}
+
+# build in separate folders so we do not overwrite the reports (and their
+# metadata) generated by dag, and disable the cache, otherwise we would be
+# timing cache hits
+out_serial = out / 'timing' / 'serial'
+out_parallel = out / 'timing' / 'parallel'
+out_serial.mkdir(parents=True, exist_ok=True)
+out_parallel.mkdir(parents=True, exist_ok=True)
+
+dag_serial = make_dag(params_all,
+                      out_serial,
+                      data_dir=out_serial / 'data',
+                      cache_dir=None)
+dag_parallel = make_dag(params_all,
+                        out_parallel,
+                        data_dir=out_parallel / 'data',
+                        cores=cores,
+                        cpu_budget=os.cpu_count(),
+                        cache_dir=None)
+print(allocate_cores(cores, os.cpu_count()))
+
+start = time.perf_counter()
+dag_serial.build(force=True)
+serial = time.perf_counter() - start
+
+start = time.perf_counter()
+dag_parallel.build(force=True)
+parallel = time.perf_counter() - start
+
+print(f'Serial: {serial:.1f} s. Parallel: {parallel:.1f} s. '
+      f'Speedup: {serial / parallel:.2f}x ({os.cpu_count()} cores)')
+# -
+
+# ## Faster hyperparameter search
+#
+# Since we are using nested cross-validation, every candidate is trained on every inner and outer fold: the NuSVR grid has 24 candidates, so it requires 600 fits. We can reduce this by changing the search strategy:
+#
+# 1. `halving`. Uses [`HalvingGridSearchCV`](https://scikit-learn.org/stable/modules/grid_search.html#successive-halving-user-guide): all candidates are evaluated using a small number of samples and only the best ones are evaluated with more samples
+# 2. `path`. Some models can efficiently evaluate many values of a hyperparameter at once, [`RidgeCV`](https://scikit-learn.org/stable/modules/generated/sklearn.linear_model.RidgeCV.html) computes the leave-one-out error for all values of `alpha` in a single fit, so we do not need a grid search at all
+#
+# Options for the search (such as the halving `factor`) are passed in `m_search_kwargs`:
+
+# +
+params_fast = {
+    'ridge': {
+        'm_init': 'pipelines.ridge_path',
+        'm_params': {
+            'reg__alphas': params_ridge['m_params']['reg__alpha']
+        },
+        'm_search': 'path',
+    },
+    'rf': {
+        **params_rf, 'm_search': 'halving',
+        'm_search_kwargs': {
+            'factor': 3
+        }
+    },
+    'nusvr': {
+        **params_nusvr, 'm_search': 'halving',
+        'm_search_kwargs': {
+            'factor': 3
+        }
+    },
+}
+
+out_fast = out / 'fast'
+out_fast.mkdir(exist_ok=True)
+# no cache, so the wall time measures the search and not loading models
+make_dag(params_fast, out_fast, cache_dir=None).build()
+# -
+
+# Let's compare wall time and selected hyperparameters (one dictionary per outer fold) with the exhaustive grid search. We use the summaries from the serial build in the previous section, since it also ran without the cache and with the same `n_jobs`:
+
+# +
+import json
+
+import pandas as pd
+
+summaries = [
+    json.loads(path.read_text())
+    for path in sorted(out_serial.glob('*.json')) +
+    sorted(out_fast.glob('*.json'))
+]
+
+pd.DataFrame(summaries)[[
+    'model', 'search', 'wall_time', 'mae', 'mse', 'best_params'
+]]
+# -
 #
 # ## Closing remarks
 #
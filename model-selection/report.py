@@ -1,45 +1,27 @@
 from IPython.display import Markdown
-import importlib
-from sklearn.datasets import load_boston
-from sklearn.model_selection import cross_val_predict, GridSearchCV
+import json
+from pathlib import Path
 import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
 # + tags=["parameters"]
 m_init = None
-m_params = None
+# name of the task that fitted the model
+fit_task = None
+upstream = None
+product = None
 # -
 
 Markdown('# Report for {}'.format(m_init))
 
-print('Params: ', m_params)
+# load the true values and the predictions from the upstream tasks
+y = np.load(upstream['data']['y'])
+y_pred = np.load(upstream[fit_task]['predictions'])
+summary = json.loads(Path(upstream[fit_task]['summary']).read_text())
 
-# +
-# m_init is module.sub_module.constructor import it from the string
-parts = m_init.split('.')
-mod_str, constructor = '.'.join(parts[:-1]), parts[-1]
-mod = importlib.import_module(mod_str)
-
-# instantiate it
-model = getattr(mod, constructor)()
-print(model)
-# -
-
-# load data
-dataset = load_boston()
-X = pd.DataFrame(dataset.data, columns=dataset.feature_names)
-y = dataset.target
-
-# +
-# Perform grid search over the passed parameters
-grid = GridSearchCV(model, m_params, n_jobs=-1)
-
-# We want to estimate generalization performance *and* tune hyperparameters
-# so we are using nested cross-validation
-y_pred = cross_val_predict(grid, X, y)
-# -
+print('Search: ', summary['search'])
+print('Selected hyperparameters: ', summary['best_params'])
 
 # prev vs actual scatter plot
 fig, ax = plt.subplots()
@@ -69,3 +51,7 @@ mae = np.abs(y - y_pred).mean()
 mse = ((y - y_pred) ** 2).mean()
 print(f'MAE: {mae:.2f}')
 print(f'MSE: {mse:.2f}')
+
+# save the summary along with the metrics to compare search strategies
+summary = {**summary, 'mae': mae, 'mse': mse}
+Path(product['summary']).write_text(json.dumps(summary, default=str))
@@ -0,0 +1,34 @@
+"""
+Measure the overhead that add_metadata adds to each call
+"""
+from timeit import timeit
+
+import pyarrow as pa
+
+from lib import add_metadata
+
+
+def make_table():
+    """
+    Make a small table
+
+    Returns
+    -------
+    id : int
+        Identifier
+    value : float
+        A value
+    """
+    return pa.table({'id': [1, 2, 3], 'value': [0.1, 0.2, 0.3]})
+
+
+if __name__ == '__main__':
+    make_table_w_metadata = add_metadata(make_table)
+    n = 10_000
+
+    plain = timeit(make_table, number=n) / n
+    decorated = timeit(make_table_w_metadata, number=n) / n
+
+    print(f'Undecorated: {plain * 1e6:.1f} us per call')
+    print(f'Decorated: {decorated * 1e6:.1f} us per call')
+    print(f'Overhead: {(decorated - plain) * 1e6:.1f} us per call')
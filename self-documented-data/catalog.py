@@ -0,0 +1,188 @@
+"""
+Index the data dictionaries of a directory of parquet files in a SQLite
+database to search columns by name or description
+
+Usage:
+
+    python catalog.py build path/to/data --db catalog.db
+    python catalog.py search "customer id" --db catalog.db
+"""
+import json
+import sqlite3
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from warnings import warn
+
+import pyarrow.parquet as pq
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    summary TEXT
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS columns USING fts5 (
+    path UNINDEXED,
+    name,
+    desc,
+    type UNINDEXED
+);
+"""
+
+
+def connect(path_to_db):
+    """Connect to the catalog, creating the tables if needed
+    """
+    conn = sqlite3.connect(path_to_db)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def read_dictionary(path_to_table):
+    """
+    Read the data dictionary from a parquet file (only the footer is
+    read), returns None if the file does not have one
+    """
+    metadata = pq.read_schema(path_to_table).metadata or {}
+
+    if b'my_metadata' not in metadata:
+        return None
+
+    return json.loads(metadata[b'my_metadata'].decode('utf-8'))
+
+
+def build(root, path_to_db='catalog.db', max_workers=16):
+    """
+    Index all parquet files in root (recursively). Only files that are new
+    or whose modification time or size changed since the last build are
+    read. Files that no longer exist are removed from the index. Files whose
+    metadata cannot be read are not indexed, so they are read again in the
+    next build
+
+    Returns
+    -------
+    dict
+        Number of files added/updated, removed, unchanged and failed
+    """
+    conn = connect(path_to_db)
+    indexed = {
+        path: (mtime, size)
+        for path, mtime, size in conn.execute(
+            'SELECT path, mtime, size FROM files')
+    }
+
+    found = {}
+
+    for path in Path(root).rglob('*.parquet'):
+        stat = path.stat()
+        found[str(path.resolve())] = (stat.st_mtime, stat.st_size)
+
+    stale = [path for path, stat in found.items() if indexed.get(path) != stat]
+    removed = [path for path in indexed if path not in found]
+    failed = 0
+
+    # reading footers is I/O bound, so we use threads
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        dictionaries = executor.map(_read_dictionary_or_warn, stale)
+
+        # sqlite connections should only be used by the thread that
+        # created them, so we write from here
+        with conn:
+            for path in removed:
+                _delete(conn, path)
+
+            for path, doc in zip(stale, dictionaries):
+                _delete(conn, path)
+
+                if doc is _FAILED:
+                    failed += 1
+                    continue
+
+                mtime, size = found[path]
+                summary = ' '.join(doc['summary']) if doc else None
+                conn.execute('INSERT INTO files VALUES (?, ?, ?, ?)',
+                             (path, mtime, size, summary))
+
+                for column in (doc['returns'] if doc else []):
+                    conn.execute('INSERT INTO columns VALUES (?, ?, ?, ?)',
+                                 (path, column['name'], column['desc'],
+                                  column['type']))
+
+    conn.close()
+
+    return {
+        'updated': len(stale) - failed,
+        'removed': len(removed),
+        'unchanged': len(found) - len(stale),
+        'failed': failed
+    }
+
+
+def search(query, path_to_db='catalog.db', limit=20):
+    """
+    Search columns by name or description (SQLite full-text search syntax),
+    returns a list of dictionaries sorted by relevance
+    """
+    conn = connect(path_to_db)
+    rows = conn.execute(
+        'SELECT path, name, desc, type FROM columns WHERE columns MATCH ? '
+        'ORDER BY rank LIMIT ?', (query, limit)).fetchall()
+    conn.close()
+
+    return [
+        dict(zip(('path', 'name', 'desc', 'type'), row)) for row in rows
+    ]
+
+
+def _delete(conn, path):
+    conn.execute('DELETE FROM files WHERE path = ?', (path, ))
+    conn.execute('DELETE FROM columns WHERE path = ?', (path, ))
+
+
+# returned by _read_dictionary_or_warn if reading fails (None means the file
+# has no data dictionary)
+_FAILED = object()
+
+
+def _read_dictionary_or_warn(path):
+    try:
+        return read_dictionary(path)
+    except Exception as e:
+        warn('Could not read metadata from "{}": {}'.format(path, e))
+        return _FAILED
+
+
+def main():
+    parser = ArgumentParser(description='Index and search data dictionaries '
+                            'in parquet files')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    common = ArgumentParser(add_help=False)
+    common.add_argument('--db', default='catalog.db', help='Catalog path')
+
+    parser_build = subparsers.add_parser('build',
+                                         help='Build the catalog',
+                                         parents=[common])
+    parser_build.add_argument('root', help='Directory with parquet files')
+    parser_build.add_argument('--max-workers', type=int, default=16)
+
+    parser_search = subparsers.add_parser('search',
+                                          help='Search columns',
+                                          parents=[common])
+    parser_search.add_argument('query')
+    parser_search.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print(build(args.root, args.db, max_workers=args.max_workers))
+    else:
+        for result in search(args.query, args.db, limit=args.limit):
+            print('{path} {name} ({type}): {desc}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,16 @@
 import json
+import random
+from time import perf_counter
 from warnings import warn
 from functools import wraps
 
 from numpydoc.docscrape import NumpyDocString
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 
 
-def add_metadata(fn, validate=False):
+def add_metadata(fn, validate=False, validate_kwargs=None):
     """
     Decorator that adds dictionary and summary to a function that returns a
     pyarrow.Table
@@ -15,24 +19,96 @@ def add_metadata(fn, validate=False):
     ----------
     validate : bool
         Shows warnings if there are extra or missing columns in the docstring
+    validate_kwargs : dict, optional
+        Extra arguments for validate_dictionary (e.g. to check types)
+
+    Notes
+    -----
+    If validate is True, the time taken by each check in the last call is
+    stored in the wrapper's validation_timings attribute
     """
+    # the special __doc__ attribute returns the docstring defined for the
+    # decorator's argument, parse it to convert it to a dictionary. The
+    # docstring does not change, so we do it (and encode it) only once
+    doc = parse_docstring(fn.__doc__)
+    doc_b = json.dumps(doc).encode('utf-8')
+    fields = fields_metadata(doc)
+
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        # the special __doc__ attribute returns the docstring defined for the
-        # decorator's argument, parse it to convert it to a dictionary
-        doc = parse_docstring(fn.__doc__)
-
         # just run the function with whatever arguments the user passed
         table = fn(*args, **kwargs)
 
         # use the returned value to validate the parsed docstring, showing
         # warnings if any
         if validate:
-            validate_dictionary(doc, table, fn.__name__)
+            wrapper.validation_timings = validate_dictionary(
+                doc, table, fn.__name__, **(validate_kwargs or {}))
 
-        # add the metadata to the table objecy
-        return add_metadata_to_table(table, doc, key='my_metadata')
+        # add the metadata to the table objecy, the whole dictionary goes
+        # to the schema and each column's entry to its field
+        table = add_fields_metadata_to_table(table, fields)
+        return add_metadata_to_table(table, doc_b, key='my_metadata')
 
+    wrapper.validation_timings = None
+    return wrapper
+
+
+def add_metadata_streaming(fn, validate=False, validate_kwargs=None):
+    """
+    Like add_metadata, but for functions that yield pyarrow.RecordBatch
+    objects. The decorated function takes the path to a parquet file as
+    first argument and writes the batches as they are generated, so only
+    one batch is kept in memory
+
+    Parameters
+    ----------
+    validate : bool
+        Shows warnings if there are extra or missing columns in the docstring
+        (only the first batch is validated)
+    validate_kwargs : dict, optional
+        Extra arguments for validate_dictionary (e.g. to check types)
+
+    Notes
+    -----
+    Timings are stored in validation_timings, like in add_metadata
+    """
+    doc = parse_docstring(fn.__doc__)
+    doc_b = json.dumps(doc).encode('utf-8')
+    fields = fields_metadata(doc)
+
+    @wraps(fn)
+    def wrapper(path, *args, **kwargs):
+        batches = iter(fn(*args, **kwargs))
+
+        try:
+            first = next(batches)
+        except StopIteration:
+            raise ValueError('Function "{}" did not yield any batches'.format(
+                fn.__name__)) from None
+
+        # add the metadata to an empty table with the same schema, and use
+        # that schema for the writer
+        table = pa.Table.from_batches([first])
+
+        if validate:
+            wrapper.validation_timings = validate_dictionary(
+                doc, table, fn.__name__, **(validate_kwargs or {}))
+
+        table = add_fields_metadata_to_table(table, fields)
+        schema = add_metadata_to_table(table.slice(0, 0),
+                                       doc_b,
+                                       key='my_metadata').schema
+
+        with pq.ParquetWriter(path, schema) as writer:
+            writer.write_table(table)
+
+            for batch in batches:
+                writer.write_table(pa.Table.from_batches([batch]))
+
+        return path
+
+    wrapper.validation_timings = None
     return wrapper
 
 
@@ -55,11 +131,53 @@ def parse_docstring(doc):
     return {'returns': returns, 'summary': summary}
 
 
-def validate_dictionary(doc, table, name):
+# functions to check if an arrow type matches a type declared in a docstring
+_TYPES = {
+    'int': pa.types.is_integer,
+    'integer': pa.types.is_integer,
+    'float': pa.types.is_floating,
+    'str': lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    'string': lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    'bool': pa.types.is_boolean,
+    'date': pa.types.is_date,
+    'datetime': pa.types.is_timestamp,
+    'timestamp': pa.types.is_timestamp,
+}
+
+
+def validate_dictionary(doc,
+                        table,
+                        name,
+                        check_types=False,
+                        checks=None,
+                        sample_size=None,
+                        random_state=None):
     """
     Validate dictionary against pyarrow.Table, warn on missing or extra
     columns
+
+    Parameters
+    ----------
+    check_types : bool, optional
+        Warn if a column's type does not match the declared type (e.g.
+        int, float, str, bool, date, datetime), unknown types are ignored
+    checks : dict, optional
+        Checks on the values, keys are column names and values are
+        dictionaries with any of: 'not_null' (bool), 'min', 'max' and
+        'categories' (list of allowed values)
+    sample_size : int, optional
+        If not None, run the value checks on a random sample of rows
+    random_state : int, optional
+        Seed for the sample
+
+    Returns
+    -------
+    dict
+        Time (in seconds) taken by each check
     """
+    timings = {}
+
+    start = perf_counter()
     # get the declared names in the "Returns" section
     expected = set(p['name'] for p in doc['returns'])
     # and the names in the table
@@ -79,31 +197,161 @@ def validate_dictionary(doc, table, name):
         warn('Data dictionary for function "{}" has extra columns: {}'.format(
             name, extra))
 
+    timings['columns'] = perf_counter() - start
+
+    if check_types:
+        start = perf_counter()
+        _check_types(doc, table, name)
+        timings['types'] = perf_counter() - start
+
+    if checks:
+        if sample_size is not None and sample_size < table.num_rows:
+            rng = random.Random(random_state)
+            indices = sorted(rng.sample(range(table.num_rows), sample_size))
+            table = table.take(pa.array(indices))
+
+        for column, column_checks in checks.items():
+            if column not in actual:
+                continue
+
+            for check, value in column_checks.items():
+                start = perf_counter()
+                _check_values(table[column], check, value, column, name)
+                timings['{}.{}'.format(column, check)] = perf_counter() - start
+
+    return timings
+
+
+def _check_types(doc, table, name):
+    for p in doc['returns']:
+        # numpydoc types may look like "int, optional"
+        declared = p['type'].split(',')[0].strip().lower()
+
+        if p['name'] not in table.column_names or declared not in _TYPES:
+            continue
+
+        actual = table.schema.field(p['name']).type
+
+        if not _TYPES[declared](actual):
+            warn('Data dictionary for function "{}" declares column "{}" as '
+                 '{}, but it has type {}'.format(name, p['name'], declared,
+                                                 actual))
+
+
+def _check_values(column, check, value, column_name, name):
+    if check == 'not_null':
+        failed = column.null_count if value else 0
+    elif check == 'min':
+        failed = pc.sum(pc.less(column, value)).as_py() or 0
+    elif check == 'max':
+        failed = pc.sum(pc.greater(column, value)).as_py() or 0
+    elif check == 'categories':
+        # nulls are not counted here, use not_null for that
+        unknown = pc.invert(pc.is_in(column, value_set=pa.array(value)))
+        failed = pc.sum(pc.and_(unknown, pc.is_valid(column))).as_py() or 0
+    else:
+        raise ValueError('Unknown check "{}"'.format(check))
+
+    if failed:
+        warn('Column "{}" returned by function "{}" failed check "{}" '
+             '({}) in {} rows'.format(column_name, name, check, value, failed))
+
 
 def add_metadata_to_table(table, metadata, key='my_metadata'):
     """
     Add json metadata to a pyarrow.Table under a given key
 
+    Parameters
+    ----------
+    metadata : dict or bytes
+        Metadata to add, if bytes, it must be the utf-8 encoded json
+        representation
+
     Notes
     -----
     Based on: https://stackoverflow.com/a/58978449/709975
     """
     # convert dictionary to json representation (str object),
     # then convert it to a bytes object encoded in utf-8
-    metadata_b = json.dumps(metadata).encode('utf-8')
+    if isinstance(metadata, bytes):
+        metadata_b = metadata
+    else:
+        metadata_b = json.dumps(metadata).encode('utf-8')
 
     # the key also has to be converted to bytes
     key = bytes(key, encoding='utf-8')
 
     # take old table's metadata (if any) and append
     # a new key with our metadata under the "my_metadata" key
-    new_schema_metadata = {**{key: metadata_b}, **table.schema.metadata}
+    new_schema_metadata = {key: metadata_b, **(table.schema.metadata or {})}
 
     # replace old metadata with the new version
     table_w_metadata = table.replace_schema_metadata(new_schema_metadata)
     return table_w_metadata
 
 
+def fields_metadata(doc):
+    """
+    Convert the "returns" section of a parsed docstring into field metadata
+    (one dictionary with bytes keys and values for each column)
+    """
+    return {
+        p['name']: {
+            b'desc': p['desc'].encode('utf-8'),
+            b'type': p['type'].encode('utf-8')
+        }
+        for p in doc['returns']
+    }
+
+
+def add_fields_metadata_to_table(table, fields):
+    """
+    Add metadata to each pyarrow.Field in a pyarrow.Table, fields is a
+    dictionary with column names as keys and metadata as values. Data is
+    not copied
+    """
+    new_fields = [
+        field.with_metadata({
+            **(field.metadata or {}),
+            **fields[field.name]
+        }) if field.name in fields else field for field in table.schema
+    ]
+    schema = pa.schema(new_fields, metadata=table.schema.metadata)
+
+    return pa.Table.from_arrays(table.columns, schema=schema)
+
+
+def read_columns_metadata(path_to_table, columns=None):
+    """
+    Read the description and type of some columns (all if None) without
+    loading the data file or the whole dictionary
+    """
+    schema = pq.read_schema(path_to_table)
+    columns = schema.names if columns is None else columns
+    return {name: _field_metadata(schema.field(name)) for name in columns}
+
+
+def read_columns_with_metadata(path_to_table, columns):
+    """
+    Read some columns from a parquet file, only the requested columns are
+    loaded. Returns the table and the description and type of each column
+    """
+    table = pq.read_table(path_to_table, columns=columns)
+    metadata = {
+        name: _field_metadata(table.schema.field(name))
+        for name in table.column_names
+    }
+    return table, metadata
+
+
+def _field_metadata(field):
+    metadata = field.metadata or {}
+    return {
+        key: metadata[key.encode('utf-8')].decode('utf-8')
+        for key in ('desc', 'type') if key.encode('utf-8') in metadata
+    }
+
+
 def read_metadata(table):
     """Read metadata from a table object
     """
@@ -25,6 +25,17 @@
 import warnings
 import logging
 import pickle
+import inspect
+import functools
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 
 import sklearn
 from sklearn.base import BaseEstimator, TransformerMixin
@@ -84,18 +95,40 @@ class InputGuard(TransformerMixin, BaseEstimator):
         if hasattr(X, 'columns'):
             self.expected_ = list(X.columns)
             self.expected_n_ = X.shape[1]
+            # precompute a signature of the columns so transform can
+            # verify the input with a single comparison (we compare the
+            # names, not their hash: hashes of strings change from one
+            # process to another, and may collide) and the position of
+            # each column, to look them up without building sets
+            self.expected_tuple_ = tuple(self.expected_)
+            self.expected_index_ = {
+                name: i
+                for i, name in enumerate(self.expected_)
+            }
         # ...but we still need to support numpy.arrays to
         # pass check_estimator
         else:
             self.expected_ = None
             self.expected_n_ = X.shape[1]
+            self.expected_tuple_ = None
+            self.expected_index_ = None
             warnings.warn('Input does not have a columns attribute, '
                           'only number of columns will be validated')
         return self
 
     def transform(self, X):
-        # these two are to pass check_estimator
         check_is_fitted(self)
+
+        # fast path: if we got a data frame with the exact same columns,
+        # there is nothing to do. We skip check_array since it copies and
+        # validates the whole matrix (the next steps in the pipeline will
+        # validate the data anyway)
+        if (self.expected_ and hasattr(X, 'columns')
+                and X.shape[1] == self.expected_n_
+                and tuple(X.columns) == self.expected_tuple_):
+            return X
+
+        # this is to pass check_estimator
         X_out = check_array(X)
         X = X if hasattr(X, 'columns') else X_out
 
@@ -110,9 +143,18 @@ class InputGuard(TransformerMixin, BaseEstimator):
 
             return X
 
+    def transform_iter(self, data, chunk_size=100_000):
+        """
+        Like transform, but takes a data frame, a path to a .csv/.parquet
+        file or an iterable of data frames and yields transformed chunks
+        """
+        for chunk in iter_chunks(data, chunk_size=chunk_size):
+            yield self.transform(chunk)
+
     def _transform(self, X):
         # this function implements our core logic and it
         # will only be called when fit received an X with a columns attribute
+        # and the columns do not match the ones seen during fit
 
         if not hasattr(X, 'columns'):
             raise ValueError('{}.fit ran with a X object that had '
@@ -121,22 +163,25 @@ class InputGuard(TransformerMixin, BaseEstimator):
 
         columns_got = list(X.columns)
 
+        got = set(columns_got)
+        missing = {name for name in self.expected_ if name not in got}
+
         if self.strict:
             if self.expected_ != columns_got:
-                missing = set(self.expected_) - set(columns_got)
                 raise ValueError('Columns during fit were: {}, but got {} '
                                  'for predict.'
                                  ' Missing: {}'.format(self.expected_,
                                                        columns_got,
                                                        missing))
         else:
-            missing = set(self.expected_) - set(columns_got)
-            extra = set(columns_got) - set(self.expected_)
+            extra = {
+                name
+                for name in columns_got if name not in self.expected_index_
+            }
 
             if missing:
                 raise ValueError('Missing columns: {}'.format(missing))
             elif extra:
-                extra = set(columns_got) - set(self.expected_)
                 warnings.warn('Got extra columns: {}, ignoring'
                               .format(extra))
                 return X[self.expected_]
@@ -195,6 +240,32 @@ _ = best_pipe.predict(X_corrupted)
 
 warnings.filterwarnings('ignore')
 
+# ### Keeping the guard cheap
+#
+# When serving a model, `transform` runs on every request, so it has to be fast. Our implementation stores a signature (a tuple with the column names) when fitting, if the input has exactly the same columns, we return it right away: no copies, no sets. The (slower) logic to detect missing and extra columns only runs when the signature is different. Let's compare it with a version that always validates the full input:
+
+# +
+import timeit
+
+
+def transform_baseline(guard, X):
+    check_array(X)
+    return guard._transform(X)
+
+
+guard = best_pipe.named_steps['guard']
+guard.strict = True
+
+for n_rows in [1, 1_000, 1_000_000]:
+    X_bench = X_train.sample(n_rows, replace=True)
+    n_runs = 1000 if n_rows < 1_000_000 else 10
+    fast = timeit.timeit(lambda: guard.transform(X_bench), number=n_runs)
+    baseline = timeit.timeit(lambda: transform_baseline(guard, X_bench),
+                             number=n_runs)
+    print(f'{n_rows:>9,} rows. fast path: {fast / n_runs * 1e6:,.1f} us, '
+          f'baseline: {baseline / n_runs * 1e6:,.1f} us')
+# -
+
 
 # ## Estimator use case: logging model's predictions
 #
@@ -231,6 +302,11 @@ class LoggingEstimator(BaseEstimator):
         # these attributes support the logging functionality
         self._logger = logging.getLogger(__name__)
         self._logging_enabled = False
+        self._writer = None
+        self._writer_kwargs = None
+        self._every_n = 1
+        self._n_calls = 0
+        self._stats = None
         self._param_names = ['est_class'] + list(kwargs.keys())
 
     # in the transformer case, we did not implement get_params
@@ -239,15 +315,49 @@ class LoggingEstimator(BaseEstimator):
     # in the constructor, so we implemented it
 
     def get_params(self, deep=True):
-        # Note: we are ignoring the deep parameter
-        # this will not work with estimators that have sub-estimators
+        params = {param: self.__dict__[param]
+                  for param in self._param_names}
+
+        # if any parameter is an estimator (e.g. a model that takes a
+        # base_estimator), also return its parameters using the
+        # <param>__<sub_param> convention
         # see https://scikit-learn.org/stable/developers/develop.html#get-params-and-set-params
-        return {param: getattr(self, param)
-                for param in self._param_names}
+        if deep:
+            for param, value in list(params.items()):
+                if hasattr(value, 'get_params') \
+                        and not isinstance(value, type):
+                    for sub_param, sub_value in value.get_params().items():
+                        params[f'{param}__{sub_param}'] = sub_value
+
+        return params
 
     def set_params(self, **parameters):
+        # est_class goes first since it determines the valid parameters
+        if 'est_class' in parameters:
+            self.est_class = parameters.pop('est_class')
+
+        valid = _get_est_class_params(self.est_class)
+        nested = {}
+
         for parameter, value in parameters.items():
-            setattr(self, parameter, value)
+            param, delim, sub_param = parameter.partition('__')
+
+            if param not in valid:
+                raise ValueError('Invalid parameter {} for estimator {}'
+                                 .format(param, self.est_class.__name__))
+
+            if delim:
+                nested.setdefault(param, {})[sub_param] = value
+            else:
+                setattr(self, parameter, value)
+
+                # parameters not passed to __init__ (e.g. set by
+                # GridSearchCV) must also be passed to the model
+                if parameter not in self._param_names:
+                    self._param_names.append(parameter)
+
+        for param, sub_params in nested.items():
+            getattr(self, param).set_params(**sub_params)
 
         return self
 
@@ -267,11 +377,103 @@ class LoggingEstimator(BaseEstimator):
 
         # we use the fitted model and log if logging is enabled
         y_pred = self.model_.predict(X)
+        self._log_predictions(y_pred)
+        return y_pred
 
-        if self._logging_enabled:
-            self._logger.info('Logging predicted values: %s', y_pred)
+    def _log_predictions(self, y_pred):
+        self._n_calls += 1
 
-        return y_pred
+        if self._stats is not None:
+            self._stats.update(y_pred)
+
+        # if every_n > 1, we only log some of the calls
+        if self._logging_enabled and self._n_calls % self._every_n == 0:
+            # in asynchronous mode we just hand over the array, formatting
+            # and writing happen in a background thread
+            if self._writer is not None:
+                self._writer.put(y_pred)
+            else:
+                self._logger.info('Logging predicted values: %s', y_pred)
+
+    def predict_iter(self, data, chunk_size=100_000, n_jobs=1,
+                     backend='thread'):
+        """
+        Make predictions in chunks, yields one array per chunk in the
+        same order as the input
+
+        Parameters
+        ----------
+        data
+            A data frame, a path to a .csv/.parquet file or an iterable
+            of data frames (or objects with a to_pandas method, such as
+            pyarrow.RecordBatch)
+        chunk_size : int, optional
+            Number of rows per chunk (ignored if data is an iterable),
+            defaults to 100,000
+        n_jobs : int, optional
+            Number of workers, defaults to 1
+        backend : str, optional
+            'thread' or 'process', defaults to 'thread'
+
+        Notes
+        -----
+        At most n_jobs chunks are processed at any given time, so memory
+        usage is bounded by chunk_size * n_jobs. Logging happens in
+        the calling process
+        """
+        check_is_fitted(self)
+        chunks = iter_chunks(data, chunk_size=chunk_size)
+
+        if n_jobs == 1:
+            for chunk in chunks:
+                y_pred = self.model_.predict(chunk)
+                self._log_predictions(y_pred)
+                yield y_pred
+            return
+
+        if backend == 'thread':
+            executor = ThreadPoolExecutor(max_workers=n_jobs)
+            predict = self.model_.predict
+        elif backend == 'process':
+            # send the model once to each worker instead of with every chunk
+            executor = ProcessPoolExecutor(max_workers=n_jobs,
+                                           initializer=_init_predict_worker,
+                                           initargs=(self.model_, ))
+            predict = _predict_in_worker
+        else:
+            raise ValueError('backend must be "thread" or "process", got: {}'
+                             .format(backend))
+
+        with executor:
+            pending = deque()
+
+            for chunk in chunks:
+                pending.append(executor.submit(predict, chunk))
+
+                # wait for the oldest chunk before reading the next one
+                if len(pending) == n_jobs:
+                    y_pred = pending.popleft().result()
+                    self._log_predictions(y_pred)
+                    yield y_pred
+
+            while pending:
+                y_pred = pending.popleft().result()
+                self._log_predictions(y_pred)
+                yield y_pred
+
+    def predict_chunked(self, data, sink=None, **kwargs):
+        """
+        Make predictions in chunks (see predict_iter). If sink is None,
+        returns all predictions in a single array, otherwise, calls
+        sink(y_pred) on each chunk and returns None
+        """
+        y_preds = self.predict_iter(data, **kwargs)
+
+        if sink is None:
+            return np.concatenate(list(y_preds))
+
+        for y_pred in y_preds:
+            sink(y_pred)
 
     # requiring a score method is not documented but throws an
     # error if not implemented
@@ -285,35 +487,125 @@ class LoggingEstimator(BaseEstimator):
     # to fix it, we try to look it up attributes in the instance, if there
     # is no instance, we look up the class. More info here:
     # https://scikit-learn.org/stable/developers/develop.html#estimator-types
+    # NOTE: clone and GridSearchCV look up many optional attributes, so
+    # we check self.__dict__ directly instead of using hasattr (which would
+    # call __getattr__ again) and fail fast for special (dunder) names
     def __getattr__(self, key):
+        if key.startswith('__') and key.endswith('__'):
+            raise AttributeError(key)
+
         if key != 'model_':
-            if hasattr(self, 'model_'):
+            if 'model_' in self.__dict__:
                 return getattr(self.model_, key)
-            else:
+            elif 'est_class' in self.__dict__:
                 return getattr(self.est_class, key)
+            else:
+                raise AttributeError(key)
         else:
             raise AttributeError(
                 "'{}' object has no attribute 'model_'".format(type(self).__name__))
 
-    # these two control logging
+    # these control logging
+
+    def enable_logging(self, asynchronous=False, every_n=1, **kwargs):
+        """
+        Enable prediction logging
+
+        Parameters
+        ----------
+        asynchronous : bool, optional
+            If True, predictions are written to .npy files by a background
+            thread (see PredictionWriter) instead of being logged with the
+            logging module, defaults to False
+        every_n : int, optional
+            Only log the predictions from one every every_n calls to
+            predict, defaults to 1 (log all calls)
+        **kwargs
+            Keyword arguments passed to PredictionWriter
+        """
+        self._close_writer()
+        self._every_n = every_n
+
+        if asynchronous:
+            self._writer_kwargs = kwargs
+            self._writer = PredictionWriter(**kwargs)
 
-    def enable_logging(self):
         self._logging_enabled = True
 
     def disable_logging(self):
+        self._close_writer()
         self._logging_enabled = False
 
+    def enable_prediction_stats(self, **kwargs):
+        """
+        Keep summary statistics and a sample of the predictions, see
+        PredictionStats for the available options
+        """
+        self._stats = PredictionStats(**kwargs)
+
+    def disable_prediction_stats(self):
+        self._stats = None
+
+    def get_prediction_stats(self):
+        """
+        Return summary statistics and the current sample of predictions
+        """
+        if self._stats is None:
+            raise ValueError('Prediction stats are not enabled, call '
+                             'enable_prediction_stats() first')
+
+        return self._stats.to_dict()
+
+    def flush(self):
+        """Wait until all logged predictions are written to disk
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """Write pending predictions and stop the background thread
+        """
+        self._close_writer()
+        self._logging_enabled = False
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+
+        self._writer = None
+        self._writer_kwargs = None
+
     # ignore the following two for now, more info in the Appendix
 
     def __getstate__(self):
+        # write pending predictions so they do not get lost
+        self.flush()
         state = self.__dict__.copy()
         del state['_logger']
+        # threads cannot be pickled, we only keep the configuration
+        state['_writer'] = None
         return state
 
     def __setstate__(self, state):
         self.__dict__.update(state)
         self._logger = logging.getLogger(__name__)
 
+        if self._writer_kwargs is not None:
+            self._writer = PredictionWriter(**self._writer_kwargs)
+
+
+# parameters that the wrapped class accepts, computed once per class
+@functools.lru_cache(maxsize=None)
+def _get_est_class_params(est_class):
+    if hasattr(est_class, '_get_param_names'):
+        names = est_class._get_param_names()
+    else:
+        names = [name for name in
+                 inspect.signature(est_class.__init__).parameters
+                 if name != 'self']
+
+    return frozenset(names)
+
 
 # `check_estimator` has a `generate_only` parameter that let us run checks one by one instead of failing at the first error. Let's use that option to check `LoggingEstimator`.
 
@@ -363,6 +655,414 @@ best_pipe.predict(X_test.iloc[0:2])
 
 best_pipe.named_steps['reg'].coef_
 
+# ### Logging without slowing down predictions
+#
+# Our logging implementation formats the whole array of predictions and writes it in the same thread that serves the prediction. Under heavy load, this can take longer than the prediction itself! A better approach is to hand over the raw array to a background thread that writes predictions in batches, `PredictionWriter` does exactly that:
+
+
+class PredictionWriter:
+    """
+    Write predictions to .npy files from a background thread
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory to store the files, defaults to 'predictions'
+    flush_interval : float, optional
+        Seconds to wait before writing the accumulated predictions,
+        defaults to 1.0
+    max_queue_size : int, optional
+        Maximum number of prediction arrays waiting to be written,
+        defaults to 1000
+    on_full : str, optional
+        What to do when the queue is full: 'drop' discards the
+        predictions, 'block' waits until there is room, defaults to 'drop'
+
+    Notes
+    -----
+    Each batch is written to a separate file, file names contain a random
+    prefix so several processes can write to the same directory. If writing
+    fails, the batch is discarded and the error is raised by the next call
+    to flush or close
+    """
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, path='predictions', flush_interval=1.0,
+                 max_queue_size=1000, on_full='drop'):
+        if on_full not in {'drop', 'block'}:
+            raise ValueError('on_full must be "drop" or "block", got: {}'
+                             .format(on_full))
+
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.on_full = on_full
+        self.dropped = 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._prefix = '{}-{}'.format(os.getpid(), uuid.uuid4().hex[:8])
+        self._n_chunks = 0
+        self._error = None
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, y_pred):
+        if self.on_full == 'block':
+            self._queue.put(y_pred)
+        else:
+            try:
+                self._queue.put_nowait(y_pred)
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self):
+        if self._thread.is_alive():
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+        self._raise_error()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+        self._raise_error()
+
+    def _raise_error(self):
+        # raise (only once) the first error found by the background thread
+        error, self._error = self._error, None
+
+        if error is not None:
+            raise error
+
+    def _write(self, batch):
+        if batch:
+            path = self.path / '{}-{}.npy'.format(self._prefix,
+                                                  self._n_chunks)
+            np.save(path, np.concatenate(batch))
+            self._n_chunks += 1
+
+    def _run(self):
+        batch, n_items = [], 0
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            else:
+                n_items += 1
+
+            if item is not None and item is not self._FLUSH \
+                    and item is not self._STOP:
+                batch.append(np.ravel(item))
+
+            # write if the interval is over or we were asked to
+            if item is None or item is self._FLUSH or item is self._STOP \
+                    or time.monotonic() >= deadline:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    # keep the thread running (otherwise flush() would
+                    # wait forever), the error is raised by flush/close
+                    if self._error is None:
+                        self._error = e
+                finally:
+                    # only mark items as done once they are on disk, so
+                    # flush() returns after everything has been written
+                    for _ in range(n_items):
+                        self._queue.task_done()
+
+                batch, n_items = [], 0
+                deadline = time.monotonic() + self.flush_interval
+
+                if item is self._STOP:
+                    break
+
+
+# Let's enable asynchronous logging. Each call to `predict` now only puts the array in a queue, `flush()` waits until everything is on disk and `close()` also stops the background thread:
+
+# +
+# write the predictions to a temporary directory, we delete it at the end
+tmp_predictions = tempfile.TemporaryDirectory()
+
+reg = best_pipe.named_steps['reg']
+reg.enable_logging(asynchronous=True, path=tmp_predictions.name,
+                   flush_interval=0.5, on_full='drop')
+
+for _ in range(100):
+    best_pipe.predict(X_test.iloc[0:2])
+
+reg.flush()
+chunks = sorted(Path(tmp_predictions.name).glob('*.npy'))
+print(f'Wrote {sum(len(np.load(c)) for c in chunks)} predictions '
+      f'in {len(chunks)} file(s)')
+# -
+
+# The writer configuration survives pickling, when unpickling, a new background thread is started:
+
+# +
+pipe_loaded = pickle.loads(pickle.dumps(best_pipe))
+pipe_loaded.predict(X_test.iloc[0:2])
+pipe_loaded.named_steps['reg'].close()
+
+reg.close()
+tmp_predictions.cleanup()
+# -
+
+# ### Summarizing predictions instead of logging them
+#
+# When scoring millions of rows, storing every prediction is often unnecessary: to monitor a model, we only need to know if the distribution of predictions changes. `PredictionStats` keeps streaming summary statistics (updated with a few vectorized operations per call to `predict`) and a fixed-size random sample of the predictions (reservoir sampling), which we use to estimate quantiles:
+
+
+class PredictionStats:
+    """
+    Streaming summary statistics and a random sample of predictions
+
+    Parameters
+    ----------
+    sample_size : int, optional
+        Number of predictions to keep in the sample, defaults to 1000
+    window : int, optional
+        If not None, the sample is restarted every window calls to
+        update, so it represents recent predictions. Summary statistics
+        are computed over all predictions. Defaults to None
+    quantiles : tuple, optional
+        Quantiles to estimate from the sample, defaults to
+        (0.05, 0.25, 0.5, 0.75, 0.95)
+    random_state : int, optional
+        Seed for the sampling, defaults to None
+    """
+
+    def __init__(self, sample_size=1000, window=None,
+                 quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), random_state=None):
+        self.sample_size = sample_size
+        self.window = window
+        self.quantiles = quantiles
+
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+        self._rng = np.random.default_rng(random_state)
+        self._n_calls = 0
+        self._reset_sample()
+
+    def _reset_sample(self):
+        self._sample = np.empty(self.sample_size)
+        self._seen = 0
+
+    def update(self, y_pred):
+        values = np.ravel(y_pred).astype(float, copy=False)
+        n = len(values)
+
+        if not n:
+            return
+
+        self._n_calls += 1
+
+        if self.window and self._n_calls > 1 \
+                and (self._n_calls - 1) % self.window == 0:
+            self._reset_sample()
+
+        # merge the batch statistics with the current ones (Chan et al.)
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean)**2).sum()
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta**2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        self._update_sample(values)
+
+    def _update_sample(self, values):
+        # fill the sample until it has sample_size elements...
+        n_fill = max(min(self.sample_size - self._seen, len(values)), 0)
+        self._sample[self._seen:self._seen + n_fill] = values[:n_fill]
+
+        # ...then, the i-th element replaces a random one with
+        # probability sample_size / i (vectorized reservoir sampling)
+        rest = values[n_fill:]
+        seen = self._seen + n_fill
+
+        if len(rest):
+            positions = np.arange(seen + 1, seen + len(rest) + 1)
+            slots = self._rng.integers(0, positions)
+            keep = slots < self.sample_size
+            self._sample[slots[keep]] = rest[keep]
+
+        self._seen = seen + len(rest)
+
+    @property
+    def sample(self):
+        return self._sample[:min(self._seen, self.sample_size)]
+
+    def to_dict(self):
+        sample = self.sample
+        quantiles = (dict(zip(self.quantiles,
+                              np.quantile(sample, self.quantiles)))
+                     if len(sample) else {})
+
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else np.nan,
+            'variance': self.m2 / self.count if self.count else np.nan,
+            'min': self.min,
+            'max': self.max,
+            'quantiles': quantiles,
+            'sample': sample.copy(),
+        }
+
+
+# Let's collect statistics while scoring a larger dataset in batches, we also log the predictions from only one every 50 calls:
+
+# +
+reg.enable_logging(every_n=50)
+reg.enable_prediction_stats(sample_size=500, random_state=0)
+
+X_large = X_train.sample(100_000, replace=True, random_state=0)
+
+for start in range(0, len(X_large), 1_000):
+    best_pipe.predict(X_large.iloc[start:start + 1_000])
+
+stats = reg.get_prediction_stats()
+print({k: v for k, v in stats.items() if k != 'sample'})
+
+reg.disable_prediction_stats()
+reg.disable_logging()
+# -
+
+# ### Scoring datasets that do not fit in memory
+#
+# `predict` needs the whole dataset in memory. To score a large file, we can read and predict it in chunks. `iter_chunks` reads a file (or splits a data frame) in chunks, `InputGuard.transform_iter` verifies each one, and `LoggingEstimator.predict_iter` scores them using a pool of workers. Results come back in the original order and only `n_jobs` chunks are processed at any given time, so memory usage depends on the chunk size, not on the size of the dataset:
+
+
+def iter_chunks(data, chunk_size=100_000):
+    """
+    Yield data frames from a data frame, a path to a .csv/.parquet
+    file or an iterable of data frames/record batches
+    """
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    elif isinstance(data, (str, Path)):
+        path = Path(data)
+
+        if path.suffix == '.parquet':
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(path).iter_batches(
+                    batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif path.suffix == '.csv':
+            yield from pd.read_csv(path, chunksize=chunk_size)
+        else:
+            raise ValueError('Unsupported file format: {}'.format(path))
+    else:
+        for chunk in data:
+            yield chunk.to_pandas() if hasattr(chunk, 'to_pandas') else chunk
+
+
+# these are used by predict_iter when backend='process'
+
+_worker_model = None
+
+
+def _init_predict_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _predict_in_worker(chunk):
+    return _worker_model.predict(chunk)
+
+
+# Let's score a file with one million rows. We fit the model on the raw data here since our pipeline includes a scaler:
+
+# +
+guard = InputGuard().fit(X_train, y_train)
+reg_raw = LoggingEstimator(est_class=ElasticNet).fit(X_train, y_train)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp, 'large.csv')
+    X_train.sample(1_000_000, replace=True).to_csv(path, index=False)
+
+    chunks = guard.transform_iter(path, chunk_size=100_000)
+    y_pred = reg_raw.predict_chunked(chunks, n_jobs=4, backend='process')
+
+print(f'Scored {len(y_pred):,} rows')
+# -
+
+# ### Large grid searches
+#
+# `GridSearchCV` clones our estimator (via `get_params`) and calls `set_params` once per candidate and fold, and with `n_jobs=-1`, it also pickles it to send it to each worker. A few details in our implementation keep this cheap: the parameters accepted by the wrapped class are computed once per class (`_get_est_class_params`), `__getattr__` does not go through `hasattr` (which calls `__getattr__` again), and the logger and the background writer are not pickled. Note that `set_params` also registers parameters that were not passed to `__init__` (like `alpha` in our grid), so they reach the wrapped model when fitting.
+#
+# Let's measure cloning and a 500-candidate grid search, and compare them with the previous implementation (shallow `get_params`, `__getattr__` using `hasattr`). The only change we make to it is registering the parameters in `set_params`, otherwise the grid values never reach the model and both searches would not fit the same models:
+
+# +
+from sklearn.base import clone
+
+
+class LoggingEstimatorBaseline(LoggingEstimator):
+    def get_params(self, deep=True):
+        return {param: getattr(self, param)
+                for param in self._param_names}
+
+    def set_params(self, **parameters):
+        for parameter, value in parameters.items():
+            setattr(self, parameter, value)
+
+            if parameter not in self._param_names:
+                self._param_names.append(parameter)
+
+        return self
+
+    def __getattr__(self, key):
+        if key != 'model_':
+            if hasattr(self, 'model_'):
+                return getattr(self.model_, key)
+            else:
+                return getattr(self.est_class, key)
+        else:
+            raise AttributeError(
+                "'{}' object has no attribute 'model_'".format(type(self).__name__))
+
+
+param_grid = {'reg__alpha': np.logspace(-3, 1, 25),
+              'reg__l1_ratio': np.linspace(0.05, 1, 20)}
+n_clones = 10_000
+
+for name, est_type in [('baseline', LoggingEstimatorBaseline),
+                       ('current', LoggingEstimator)]:
+    reg = est_type(est_class=ElasticNet, alpha=1.0)
+    elapsed = timeit.timeit(lambda: clone(reg).set_params(alpha=0.5),
+                            number=n_clones)
+    print(f'[{name}] clone + set_params: '
+          f'{elapsed / n_clones * 1e6:.1f} us')
+
+    pipe = Pipeline([('guard', InputGuard()),
+                     ('scaler', StandardScaler()),
+                     ('reg', est_type(est_class=ElasticNet))])
+
+    start = time.perf_counter()
+    grid = GridSearchCV(pipe, param_grid=param_grid,
+                        n_jobs=-1).fit(X_train, y_train)
+    print(f'[{name}] 500-candidate grid search: '
+          f'{time.perf_counter() - start:.1f} s')
+
+print(grid.best_params_)
+# -
+
 # ### Appendix: making our estimator work with  `pickle` (or any other pickling mechanism)
 #
 # Pickling an object means saving it to disk. This is useful if we want to fit and then deploy a model ([be careful when doing this!](https://scikit-learn.org/stable/modules/model_persistence.html#security-maintainability-limitations)) but it is also needed if we want our model to work with the `multiprocessing` module. Some objects are *picklable* but some others are not (this also depends on which library you are using). `logger` objects do not work with the `pickle` module but we can easily fix this by deleting it before saving to disk and initializing it after loading, this boils down to adding two more methods: `__getstate__` and `__setstate__`, if you are interested in the details, [read this](https://docs.python.org/3/library/pickle.html#handling-stateful-objects).